@@ -10,11 +10,14 @@ def cli():
 
 
 @click.command()
-def ls():
+@click.option("-r", "--refresh", is_flag=True, help="read again the NSDs from the NFVOs")
+def ls(refresh):
     """
     List all network services
     """
     url = "http://localhost:8000/api/nslist"
+    if refresh:
+        url += "/refresh"
     r = None
     try:
         r = requests.get(url, timeout=30)
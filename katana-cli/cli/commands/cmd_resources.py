@@ -1,5 +1,6 @@
 import requests
 import json
+import time
 import click
 
 
@@ -10,14 +11,18 @@ def cli():
 
 
 @click.command()
-def ls():
+@click.option(
+    "-m", "--max-age", type=int, help="refresh the VIM resources that are older than N seconds"
+)
+def ls(max_age):
     """
     List all resources
     """
     url = "http://localhost:8000/api/resources"
+    params = {"max_age": max_age} if max_age is not None else None
     r = None
     try:
-        r = requests.get(url, timeout=30)
+        r = requests.get(url, params=params, timeout=60)
         r.raise_for_status()
         json_data = json.loads(r.content)
         click.echo(json.dumps(json_data, indent=2))
@@ -34,14 +39,18 @@ def ls():
 
 @click.command()
 @click.argument("location")
-def location(location):
+@click.option(
+    "-m", "--max-age", type=int, help="refresh the VIM resources that are older than N seconds"
+)
+def location(location, max_age):
     """
     List all resources in the specific location
     """
     url = "http://localhost:8000/api/resources/" + location
+    params = {"max_age": max_age} if max_age is not None else None
     r = None
     try:
-        r = requests.get(url, timeout=30)
+        r = requests.get(url, params=params, timeout=60)
         r.raise_for_status()
         json_data = json.loads(r.content)
         click.echo(json.dumps(json_data, indent=2))
@@ -78,6 +87,43 @@ def updatedb():
         print("Error:", err)
 
 
+@click.command()
+@click.argument("vim_id")
+@click.option(
+    "-r",
+    "--resolution",
+    type=click.Choice(["raw", "1m", "1h"]),
+    default="1m",
+    help="resolution of the history",
+)
+@click.option("-s", "--since", type=int, default=3600, help="seconds of history to return")
+@click.option("-w", "--window", type=int, help="seconds aggregated in each entry")
+def history(vim_id, resolution, since, window):
+    """
+    Show the history of the resources of a VIM
+    """
+    url = "http://localhost:8000/api/resources/history/" + vim_id
+    params = {"resolution": resolution, "since": time.time() - since}
+    if window:
+        params["window"] = window
+    r = None
+    try:
+        r = requests.get(url, params=params, timeout=30)
+        r.raise_for_status()
+        json_data = json.loads(r.content)
+        click.echo(json.dumps(json_data, indent=2))
+    except requests.exceptions.HTTPError as errh:
+        print("Http Error:", errh)
+        click.echo(r.content)
+    except requests.exceptions.ConnectionError as errc:
+        print("Error Connecting:", errc)
+    except requests.exceptions.Timeout as errt:
+        print("Timeout Error:", errt)
+    except requests.exceptions.RequestException as err:
+        print("Error:", err)
+
+
 cli.add_command(updatedb)
+cli.add_command(history)
 cli.add_command(ls)
 cli.add_command(location)
@@ -13,15 +13,19 @@ def cli():
 
 
 @click.command()
-def ls():
+@click.option("--status", help="List only the slices with the given status")
+@click.option("--limit", type=int, help="Max number of slices to list")
+@click.option("--after", help="List the slices after the given slice id")
+def ls(status, limit, after):
     """
     List slices
     """
 
     url = "http://localhost:8000/api/slice"
+    params = {"status": status, "limit": limit, "after": after}
     r = None
     try:
-        r = requests.get(url, timeout=30)
+        r = requests.get(url, params=params, timeout=30)
         r.raise_for_status()
         json_data = json.loads(r.content)
         print(console_formatter("SLICE_ID", "CREATED AT", "STATUS"))
@@ -35,6 +39,8 @@ def ls():
                     json_data[i]["status"],
                 )
             )
+        if "X-Next-Cursor" in r.headers:
+            print("More slices: --after " + r.headers["X-Next-Cursor"])
 
     except requests.exceptions.HTTPError as errh:
         print("Http Error:", errh)
@@ -1,8 +1,12 @@
 import logging
 import logging.handlers
+import os
+import threading
+import time
 
 from katana.shared_utils.kafkaUtils import kafkaUtils
 from katana.utils.sliceUtils import sliceUtils
+from katana.utils.workerUtils import workerUtils
 
 
 # Logging Parameters
@@ -17,9 +21,40 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
+# Number of slice workflows that can run in parallel
+SLICE_WORKERS = int(os.getenv("KATANA_SLICE_WORKERS", 4))
+# Seconds between the renewals of the slice leases
+WATCH_INTERVAL = sliceUtils.LEASE_TIME / 3
+
+
+def watch_slices():
+    """
+    Renews the leases of the slices that are handled by this process and resumes
+    the slices that were interrupted, e.g. by a restart of a katana-mngr
+    """
+    while True:
+        try:
+            sliceUtils.renew_leases(pool.active())
+            for slice_json in sliceUtils.interrupted_slices(exclude=pool.active()):
+                pool.submit(slice_json["_id"], sliceUtils.resume_slice, slice_json)
+        except Exception as e:
+            logger.exception(f"Failed to check the slice leases: {e}")
+        time.sleep(WATCH_INTERVAL)
+
+
 # Create Kafka topic
 kafkaUtils.create_topic()
 
+# Convert the GSTs of older versions
+sliceUtils.migrate_gsts()
+
+# Create the pool that runs the slice workflows
+pool = workerUtils.SliceWorkerPool(max_workers=SLICE_WORKERS)
+logger.info(f"Slice worker pool with {SLICE_WORKERS} workers")
+
+# Resume the interrupted slices
+threading.Thread(target=watch_slices, name="slice-watcher", daemon=True).start()
+
 # Create the Kafka Consumer
 consumer = kafkaUtils.create_consumer()
 
@@ -27,17 +62,29 @@ consumer = kafkaUtils.create_consumer()
 for message in consumer:
     logger.info("--- New Message ---")
     logger.info(
-        "Topic: {0} | Partition: {1} | Offset: {2}".format(
-            message.topic, message.partition, message.offset
+        "Topic: {0} | Partition: {1} | Offset: {2} | Key: {3}".format(
+            message.topic, message.partition, message.offset, message.key
         )
     )
-    # Commit the latest received message
-    consumer.commit()
     action = message.value["action"]
     payload = message.value["message"]
+    # Store the request before committing the message, so it is resumed if it is not
+    # completed
     # Add slice
     if action == "add":
-        sliceUtils.add_slice(payload)
+        sliceUtils.register_slice(payload)
+        consumer.commit()
+        pool.submit(payload["_id"], sliceUtils.add_slice, payload)
     # Delete slice
     elif action == "delete":
-        sliceUtils.delete_slice(payload)
+        claimed = sliceUtils.register_deletion(payload["_id"])
+        consumer.commit()
+        if claimed:
+            pool.submit(payload["_id"], sliceUtils.delete_slice, payload)
+        else:
+            logger.info(
+                f"Slice {payload['_id']} was not claimed - It does not exist or it is handled"
+                " by another katana-mngr"
+            )
+    else:
+        consumer.commit()
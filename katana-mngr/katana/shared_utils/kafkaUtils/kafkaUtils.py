@@ -1,6 +1,9 @@
+import atexit
 import json
 import logging
 from logging import handlers
+import os
+import threading
 import time
 
 from kafka import KafkaAdminClient, KafkaConsumer, KafkaProducer, admin, errors
@@ -20,6 +23,19 @@ logger.addHandler(stream_handler)
 # NOTE: It is required to have global parameters for kafka objects
 consumer, producer, topic = None, None, None
 
+# Number of partitions of the slice topic. Messages are keyed by the slice id, so the
+# messages of a slice always go to the same partition and are consumed in order, while
+# the partitions are shared among the katana-mngr instances of the consumer group
+SLICE_PARTITIONS = int(os.getenv("KATANA_SLICE_PARTITIONS", 4))
+
+# Seconds to wait for the broker to acknowledge a message
+SEND_TIMEOUT = 10
+# Times to retry the connection to kafka when the producer is created on request
+PRODUCER_TRIES = 2
+# The process that created the producer. A forked process must create its own
+producer_pid = None
+producer_lock = threading.Lock()
+
 
 def create_consumer():
     global consumer
@@ -33,9 +49,10 @@ def create_consumer():
                 "slice",
                 bootstrap_servers=["kafka:19092"],
                 auto_offset_reset="earliest",
-                enable_auto_commit=True,
-                auto_commit_interval_ms=10000,
+                # The offsets are committed after the requests are stored
+                enable_auto_commit=False,
                 group_id="katana-mngr-group",
+                key_deserializer=lambda k: k.decode("ascii") if k else None,
                 value_deserializer=lambda m: json.loads(m.decode("ascii")),
             )
         except errors.NoBrokersAvailable as KafkaError:
@@ -52,16 +69,16 @@ def create_consumer():
     return consumer
 
 
-def create_producer():
+def create_producer(tries=30):
     global producer
 
     # Create the kafka producer
-    tries = 30
     exit = False
     while not exit:
         try:
             producer = KafkaProducer(
                 bootstrap_servers=["kafka:19092"],
+                key_serializer=lambda k: k.encode("ascii") if k is not None else None,
                 value_serializer=lambda m: json.dumps(m).encode("ascii"),
             )
         except errors.NoBrokersAvailable as KafkaError:
@@ -71,6 +88,8 @@ def create_producer():
                 time.sleep(5)
             else:
                 logger.error(KafkaError)
+                producer = None
+                exit = True
         else:
             logger.info("New producer")
             exit = True
@@ -78,6 +97,55 @@ def create_producer():
     return producer
 
 
+def get_producer():
+    """
+    Returns the kafka producer of this process. It is created on the first call
+    """
+    global producer_pid
+
+    with producer_lock:
+        if producer is None or producer_pid != os.getpid():
+            create_producer(tries=PRODUCER_TRIES)
+            if producer is None:
+                raise errors.NoBrokersAvailable()
+            producer_pid = os.getpid()
+    return producer
+
+
+def close_producer():
+    """
+    Sends any pending messages and closes the producer
+    """
+    if producer is not None and producer_pid == os.getpid():
+        producer.close(timeout=SEND_TIMEOUT)
+
+
+atexit.register(close_producer)
+
+
+def send_message(topic_name, value, key=None):
+    """
+    Sends a message and waits until the broker acknowledges it
+    Messages with the same key are sent to the same partition
+    Raises KafkaError if the message was not delivered
+    """
+    future = get_producer().send(topic_name, value=value, key=key)
+    future.add_errback(
+        lambda e: logger.error("Message to topic {0} was not delivered: {1}".format(topic_name, e))
+    )
+    return future.get(timeout=SEND_TIMEOUT)
+
+
+def check_topic_errors(response):
+    """
+    Raises the errors returned by the broker for the topics of an admin request
+    """
+    for topic_error in response.topic_errors:
+        error_type = errors.for_code(topic_error[1])
+        if error_type is not errors.NoError:
+            raise error_type(topic_error[0])
+
+
 def create_topic():
     global topic
 
@@ -86,14 +154,30 @@ def create_topic():
     exit = False
     while not exit:
         try:
+            broker = KafkaAdminClient(bootstrap_servers="kafka:19092")
             try:
-                topic = admin.NewTopic(name="slice", num_partitions=1, replication_factor=1)
-                broker = KafkaAdminClient(bootstrap_servers="kafka:19092")
-                broker.create_topics([topic])
+                topic = admin.NewTopic(
+                    name="slice", num_partitions=SLICE_PARTITIONS, replication_factor=1
+                )
+                check_topic_errors(broker.create_topics([topic]))
             except errors.TopicAlreadyExistsError:
                 logger.warning("Topic exists already")
+                # Add partitions to a topic that was created with fewer partitions
+                # NOTE: Partitions can only be increased
+                try:
+                    check_topic_errors(
+                        broker.create_partitions(
+                            {"slice": admin.NewPartitions(total_count=SLICE_PARTITIONS)}
+                        )
+                    )
+                except errors.InvalidPartitionsError:
+                    pass
+                else:
+                    logger.info(f"Topic partitions increased to {SLICE_PARTITIONS}")
             else:
-                logger.info("New topic")
+                logger.info(f"New topic with {SLICE_PARTITIONS} partitions")
+            finally:
+                broker.close()
         except errors.NoBrokersAvailable as KafkaError:
             if tries > 0:
                 tries -= 1
@@ -1,4 +1,6 @@
-from pymongo import MongoClient, ASCENDING
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, ASCENDING, ReturnDocument, UpdateMany, UpdateOne
 
 
 client = MongoClient("mongodb://mongo")
@@ -13,26 +15,82 @@ db.policy.create_index([('id', ASCENDING)], unique=True)
 db.nsd.create_index([('nsd-id', ASCENDING)], unique=True)
 db.vnfd.create_index([('vnfd-id', ASCENDING)], unique=True)
 db.func.create_index([('id', ASCENDING)], unique=True)
+db.func.create_index([('location', ASCENDING), ('gen', ASCENDING), ('func', ASCENDING)])
+# Indexes of the filters of the list endpoints
+db.slice.create_index([('status', ASCENDING), ('_id', ASCENDING)])
+db.func.create_index([('location', ASCENDING), ('_id', ASCENDING)])
+db.vim_resources_ts.create_index(
+    [('vim_id', ASCENDING), ('resolution', ASCENDING), ('start', ASCENDING)]
+)
+db.vim_resources_ts.create_index([('expire_at', ASCENDING)], expireAfterSeconds=0)
+# The GSTs are deleted when they are not used by any slice for the retention period
+db.gst.create_index([('slices', ASCENDING)])
+db.gst.create_index([('expire_at', ASCENDING)], expireAfterSeconds=0)
+# The placement reservations are deleted when the slice is not deployed or refreshed in time
+db.reservation.create_index([('expire_at', ASCENDING)], expireAfterSeconds=0)
+
+# The raw reads return the BSON of the documents, without decoding it
+RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def get_collection(collection_name, raw=False):
+    if raw:
+        return db[collection_name].with_options(codec_options=RAW_OPTIONS)
+    return db[collection_name]
+
+
+def index(collection_name, data=None, projection=None, limit=0, after=None, raw=False):
+    collection = get_collection(collection_name, raw)
+    data = dict(data or {})
+    if after is not None:
+        data["_id"] = {"$gt": after}
+    return collection.find(data, projection).sort("_id", ASCENDING).limit(limit)
+
+
+def get(collection_name, uuid, raw=False):
+    collection = get_collection(collection_name, raw)
+    return collection.find_one({"_id": uuid})
 
 
-def index(collection_name):
+def add(collection_name, json_data):
     collection = db[collection_name]
-    return collection.find({})
+    return collection.insert_one(json_data).inserted_id
 
 
-def get(collection_name, uuid):
+def add_many(collection_name, list_data):
     collection = db[collection_name]
-    return collection.find_one({"_id": uuid})
+    return collection.insert_many(list_data).inserted_ids
 
 
-def add(collection_name, json_data):
+def upsert_many(collection_name, key, list_data):
     collection = db[collection_name]
-    return collection.insert_one(json_data).inserted_id
+    operations = []
+    for json_data in list_data:
+        json_data = dict(json_data)
+        uuid = json_data.pop("_id", None)
+        update = {"$set": json_data}
+        if uuid:
+            update["$setOnInsert"] = {"_id": uuid}
+        operations.append(UpdateOne({key: json_data[key]}, update, upsert=True))
+    if not operations:
+        return None
+    return collection.bulk_write(operations, ordered=False)
+
+
+def bulk_upsert(collection_name, updates):
+    collection = db[collection_name]
+    operations = [UpdateOne(data, update, upsert=True) for data, update in updates]
+    if not operations:
+        return None
+    return collection.bulk_write(operations, ordered=False)
 
 
-def add_many(collection_name, list_data):
+def bulk_update(collection_name, updates):
     collection = db[collection_name]
-    return collection.insert_many(list_data).inserted_ids
+    operations = [UpdateMany(data, update) for data, update in updates]
+    if not operations:
+        return None
+    return collection.bulk_write(operations)
 
 
 def delete(collection_name, uuid):
@@ -45,13 +103,40 @@ def update(collection_name, uuid, json_data):
     return collection.replace_one({"_id": uuid}, json_data).modified_count
 
 
+def update_fields(collection_name, uuid, json_data, unset_data=(), upsert=False):
+    collection = db[collection_name]
+    update = {}
+    if json_data:
+        update["$set"] = json_data
+    if unset_data:
+        update["$unset"] = {field: "" for field in unset_data}
+    if not update:
+        return 0
+    return collection.update_one({"_id": uuid}, update, upsert=upsert).modified_count
+
+
+def update_all(collection_name, data, json_data):
+    collection = db[collection_name]
+    return collection.update_many(data, {"$set": json_data}).modified_count
+
+
+def find_and_update(collection_name, data, json_data, inc_data=None):
+    collection = db[collection_name]
+    update = {}
+    if json_data:
+        update["$set"] = json_data
+    if inc_data:
+        update["$inc"] = inc_data
+    return collection.find_one_and_update(data, update, return_document=ReturnDocument.AFTER)
+
+
 def count(collection_name):
     collection = db[collection_name]
     return collection.count_documents({})
 
 
-def find(collection_name, data={}):
-    collection = db[collection_name]
+def find(collection_name, data={}, raw=False):
+    collection = get_collection(collection_name, raw)
     return collection.find_one(data)
 
 
@@ -1,7 +1,8 @@
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import logging
 from logging import handlers
-from multiprocessing import Process
 
 import kubernetes
 
@@ -18,26 +19,32 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
+# Seconds to wait for a function wrapped with timeout
+TIMEOUT = 5
+# Threads that run the functions wrapped with timeout. They are shared by all the objects
+# of the module
+TIMEOUT_WORKERS = 10
+timeout_executor = ThreadPoolExecutor(
+    max_workers=TIMEOUT_WORKERS, thread_name_prefix="kubernetes-timeout"
+)
+
+
 def timeout(func):
     """
-    Wrapper for function, terminate after 5 seconds
+    Wrapper for function, raise TimeoutError after 5 seconds
+    Returns the result of the function, or raises its exception
     """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        action = Process(target=func, args=args, kwargs=kwargs)
-        action.start()
-        action.join(timeout=5)
-        if action.is_alive():
-            # terminate function
-            action.terminate()
-            # clean up
-            action.join()
-            raise (TimeoutError)
-        # if process is not 0, is not succesfull
-        if action.exitcode != 0:
-            # raise Attirbute Error, which is the most probable
-            raise (AttributeError)
+        future = timeout_executor.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=TIMEOUT)
+        except futures.TimeoutError:
+            # NOTE: A running thread cannot be terminated, it is left to finish in the
+            # background. If it has not started yet, it is cancelled
+            future.cancel()
+            raise TimeoutError
 
     return wrapper
 
@@ -1,7 +1,8 @@
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import logging
 from logging import handlers
-from multiprocessing import Process
 
 import pyone
 
@@ -18,26 +19,32 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
+# Seconds to wait for a function wrapped with timeout
+TIMEOUT = 5
+# Threads that run the functions wrapped with timeout. They are shared by all the objects
+# of the module
+TIMEOUT_WORKERS = 10
+timeout_executor = ThreadPoolExecutor(
+    max_workers=TIMEOUT_WORKERS, thread_name_prefix="opennebula-timeout"
+)
+
+
 def timeout(func):
     """
-    Wrapper for function, terminate after 5 seconds
+    Wrapper for function, raise TimeoutError after 5 seconds
+    Returns the result of the function, or raises its exception
     """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        action = Process(target=func, args=args, kwargs=kwargs)
-        action.start()
-        action.join(timeout=5)
-        if action.is_alive():
-            # terminate function
-            action.terminate()
-            # clean up
-            action.join()
-            raise (TimeoutError)
-        # if process is not 0, is not succesfull
-        if action.exitcode != 0:
-            # raise Attirbute Error, which is the most probable
-            raise (AttributeError)
+        future = timeout_executor.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=TIMEOUT)
+        except futures.TimeoutError:
+            # NOTE: A running thread cannot be terminated, it is left to finish in the
+            # background. If it has not started yet, it is cancelled
+            future.cancel()
+            raise TimeoutError
 
     return wrapper
 
@@ -187,3 +194,38 @@ class Opennebula:
         sec_group = "dummy"
 
         return {"sliceProjectName": project, "sliceUserName": user, "secGroupName": sec_group}
+
+    def get_resources(self):
+        """
+        Returns the total and the used resources of the OpenNebula hosts
+        """
+        conn = pyone.OneServer(
+            self.auth_url, session="{0}:{1}".format(self.username, self.password)
+        )
+        hostpool = conn.hostpool.info()
+        compute_nodes = 0
+        report = {
+            "memory_mb": 0,
+            "free_ram_mb": 0,
+            "vcpus": 0,
+            "vcpus_used": 0,
+            "local_gb": 0,
+            "local_gb_used": 0,
+            "running_vms": 0,
+        }
+        for host in hostpool.HOST:
+            share = host.get_HOST_SHARE()
+            # Memory is reported in KB, disk in MB and CPU in percentage of a core
+            report["memory_mb"] += share.get_MAX_MEM() // 1024
+            report["free_ram_mb"] += (share.get_MAX_MEM() - share.get_USED_MEM()) // 1024
+            report["vcpus"] += share.get_MAX_CPU() // 100
+            report["vcpus_used"] += share.get_USED_CPU() // 100
+            report["local_gb"] += share.get_MAX_DISK() // 1024
+            report["local_gb_used"] += share.get_USED_DISK() // 1024
+            report["running_vms"] += share.get_RUNNING_VMS()
+            # MONITORING_MONITORED or MONITORED
+            if host.get_STATE() in (1, 2):
+                compute_nodes += 1
+        report["vcpuse_available"] = report["vcpus"] - report["vcpus_used"]
+        report["compute_nodes"] = compute_nodes
+        return report
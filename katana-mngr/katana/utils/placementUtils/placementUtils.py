@@ -0,0 +1,247 @@
+from datetime import datetime, timedelta
+import logging
+import logging.handlers
+import os
+import time
+
+from katana.shared_utils.mongoUtils import mongoUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = logging.handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+# The resources of an NSD flavor, in the order they are used in the resource vectors
+RESOURCE_KEYS = ("memory-mb", "vcpu-count", "storage-gb", "instances")
+UNLIMITED = float("inf")
+
+# binpack: Fill the VIM with the least free resources that fits the NS
+# spread: Use the VIM with the most free resources
+STRATEGIES = ("binpack", "spread")
+PLACEMENT_STRATEGY = os.getenv("KATANA_PLACEMENT_STRATEGY", "spread")
+
+# Overcommit ratios of the VIMs (OpenStack defaults)
+RAM_ALLOCATION_RATIO = float(os.getenv("KATANA_RAM_ALLOCATION_RATIO", 1.5))
+CPU_ALLOCATION_RATIO = float(os.getenv("KATANA_CPU_ALLOCATION_RATIO", 16.0))
+DISK_ALLOCATION_RATIO = float(os.getenv("KATANA_DISK_ALLOCATION_RATIO", 1.0))
+
+# Max seconds that the resources of a deployed slice stay reserved, in case the resources
+# of its VIMs are not refreshed
+RESERVATION_TTL = 600
+# Max seconds that a reservation is kept, in case its slice was never completed or released
+RESERVATION_MAX_AGE = 3600
+# Max number of times that the VIM of an NS is selected, if other katana-mngr processes
+# reserve resources on it in the meantime
+PLACEMENT_ATTEMPTS = 3
+
+# NOTE: The reservations are stored in the reservation collection, so they are shared by
+# all the katana-mngr processes and they expire with a TTL index. Every new reservation
+# increases the reservation_version of its VIM, so a process that selected the VIM based on
+# older reservations selects again instead of overbooking it
+# {"_id": slice_id, "vims": {vim_id: {resource: value}}, "created_at", "done_at", "expire_at"}
+
+
+def flavor_vector(flavor):
+    """
+    Returns the resources of a flavor as a list
+    """
+    return [flavor.get(key, 0) for key in RESOURCE_KEYS]
+
+
+def capacity_vector(vim):
+    """
+    Returns the total and the free resources of a VIM as lists
+    Returns None, None if the VIM does not report its resources
+    """
+    resources = vim.get("resources", {})
+    try:
+        total = [
+            resources["memory_mb"] * RAM_ALLOCATION_RATIO,
+            resources["vcpus"] * CPU_ALLOCATION_RATIO,
+            resources["local_gb"] * DISK_ALLOCATION_RATIO,
+            UNLIMITED,
+        ]
+        used = [
+            resources["memory_mb"] - resources["free_ram_mb"],
+            resources["vcpus_used"],
+            resources["local_gb_used"],
+            0,
+        ]
+    except (KeyError, TypeError):
+        return None, None
+    free = [t - u for t, u in zip(total, used)]
+    return total, free
+
+
+def reserved_vector(vim, reservation_list):
+    """
+    Returns the resources of a VIM that are reserved by the slices
+    """
+    reserved = [0] * len(RESOURCE_KEYS)
+    updated_at = vim.get("resources_updated_at", 0)
+    for reservation in reservation_list:
+        done_at = reservation.get("done_at")
+        if done_at and done_at < updated_at:
+            # The slice was deployed before the last refresh of the VIM resources, so its
+            # resources are already counted as used
+            continue
+        vim_reservation = reservation.get("vims", {}).get(vim["id"], {})
+        for i, key in enumerate(RESOURCE_KEYS):
+            reserved[i] += vim_reservation.get(key, 0)
+    return reserved
+
+
+def score(total, free, demand):
+    """
+    Returns the smallest fraction of a resource that will be left free on the VIM
+    """
+    fractions = [
+        (f - d) / t for t, f, d in zip(total, free, demand) if t not in (0, UNLIMITED)
+    ]
+    return min(fractions) if fractions else 0
+
+
+def choose_vim(vim_list, demand, reservation_list, strategy):
+    """
+    Selects the VIM where the NS will be placed, without reserving its resources
+    Returns the VIM document, or None if no VIM has enough resources
+    """
+    vims = {vim["id"]: vim for vim in vim_list}
+    fitting, unknown = [], []
+    for vim in vim_list:
+        total, free = capacity_vector(vim)
+        if total is None:
+            unknown.append(vim["id"])
+            continue
+        reserved = reserved_vector(vim, reservation_list)
+        free = [f - r for f, r in zip(free, reserved)]
+        if all(f >= d for f, d in zip(free, demand)):
+            fitting.append((score(total, free, demand), vim["id"]))
+    if fitting:
+        if strategy == "binpack":
+            return vims[min(fitting, key=lambda x: (x[0], x[1]))[1]]
+        return vims[min(fitting, key=lambda x: (-x[0], x[1]))[1]]
+    if unknown:
+        # The resources of these VIMs are not known - Use them as a last resort
+        return vims[sorted(unknown)[0]]
+    return None
+
+
+def reserve(slice_id, vim_id, demand):
+    """
+    Adds the given resources to the reservation of the slice on a VIM
+    """
+    mongoUtils.bulk_upsert(
+        "reservation",
+        [
+            (
+                {"_id": slice_id},
+                {
+                    "$inc": {
+                        f"vims.{vim_id}.{key}": value for key, value in zip(RESOURCE_KEYS, demand)
+                    },
+                    "$setOnInsert": {
+                        "created_at": time.time(),
+                        "done_at": None,
+                        "expire_at": datetime.utcnow() + timedelta(seconds=RESERVATION_MAX_AGE),
+                    },
+                },
+            )
+        ],
+    )
+
+
+def select_vim(vim_list, flavor, slice_id, strategy=None):
+    """
+    Selects the VIM where the NS will be placed and reserves the resources of the flavor
+    vim_list: The candidate VIM documents, as read before this call
+    Returns the id of the VIM, or None if no VIM has enough resources
+    """
+    strategy = strategy or PLACEMENT_STRATEGY
+    if strategy not in STRATEGIES:
+        logger.warning(f"Unknown placement strategy {strategy} - Using spread")
+        strategy = "spread"
+    demand = flavor_vector(flavor)
+    vim_ids = [vim["id"] for vim in vim_list]
+    for attempt in range(PLACEMENT_ATTEMPTS):
+        if attempt:
+            # The VIMs are read before the reservations, so a reservation that is not read
+            # has changed the reservation_version of its VIM
+            vim_list = list(mongoUtils.find_all("vim", {"id": {"$in": vim_ids}}))
+        reservation_list = list(
+            mongoUtils.find_all("reservation", {"expire_at": {"$gt": datetime.utcnow()}})
+        )
+        selected_vim = choose_vim(vim_list, demand, reservation_list, strategy)
+        if not selected_vim:
+            return None
+        # Store the reservation before the version, so the processes that read the new
+        # version also read the reservation
+        reserve(slice_id, selected_vim["id"], demand)
+        version_data = {
+            "id": selected_vim["id"],
+            "reservation_version": selected_vim.get("reservation_version"),
+        }
+        if mongoUtils.find_and_update(
+            "vim", version_data, {}, inc_data={"reservation_version": 1}
+        ):
+            return selected_vim["id"]
+        # Another process reserved resources on the VIM in the meantime - Select again
+        reserve(slice_id, selected_vim["id"], [-value for value in demand])
+    logger.warning(f"Slice {slice_id}: The VIMs were reserved by other slices - No VIM selected")
+    return None
+
+
+def complete(slice_id):
+    """
+    The slice is deployed - Keep its resources reserved until the VIM resources are refreshed
+    """
+    mongoUtils.update_fields(
+        "reservation",
+        slice_id,
+        {
+            "done_at": time.time(),
+            "expire_at": datetime.utcnow() + timedelta(seconds=RESERVATION_TTL),
+        },
+    )
+
+
+def release(slice_id):
+    """
+    Release the resources that are reserved by a slice
+    """
+    mongoUtils.delete("reservation", slice_id)
+
+
+def restore(slice_id, vim_dict):
+    """
+    Reserve again the resources of a slice whose deployment is resumed, if its reservation
+    has expired
+    vim_dict: The VIMs of the slice, with the resources of the NSs placed on each VIM
+    """
+    vims = {
+        vim_id: {key: vim_info.get("resources", {}).get(key, 0) for key in RESOURCE_KEYS}
+        for vim_id, vim_info in vim_dict.items()
+    }
+    mongoUtils.bulk_upsert(
+        "reservation",
+        [
+            (
+                {"_id": slice_id},
+                {
+                    "$setOnInsert": {
+                        "vims": vims,
+                        "created_at": time.time(),
+                        "done_at": None,
+                        "expire_at": datetime.utcnow() + timedelta(seconds=RESERVATION_MAX_AGE),
+                    }
+                },
+            )
+        ],
+    )
@@ -0,0 +1,193 @@
+import logging
+import logging.handlers
+import threading
+import time
+
+from katana.shared_utils.adapterUtils import adapterUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = logging.handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+# Limits (in seconds) of the interval between the NS status polls
+POLL_MIN_INTERVAL = 2
+POLL_MAX_INTERVAL = 20
+# Max seconds that a slice waits for its NSs
+WAIT_TIMEOUT = 1800
+# The NS status values of OSM that will not change to running and configured
+NS_FAILED_STATUS = ("failed",)
+
+# NOTE: The NSs of all the slices that are deployed or deleted by this process are polled
+# together, with one request per NFVO on every round
+# [{"nfvo_id", "ns_id", "kind": "ready" | "terminated", "done": bool, "result"}]
+# The result of a failed NS is {"error": reason}
+waiters = []
+condition = threading.Condition()
+wakeup = threading.Event()
+poller_thread = None
+
+
+def ns_ready(nsr):
+    """
+    Checks if a NS is running and configured
+    """
+    return nsr["operational-status"] == "running" and nsr["config-status"] == "configured"
+
+
+def ns_failed(nsr):
+    """
+    Checks if the deployment or the configuration of a NS failed
+    """
+    return (
+        nsr["operational-status"] in NS_FAILED_STATUS or nsr["config-status"] in NS_FAILED_STATUS
+    )
+
+
+def fail(nfvo_waiters, reason):
+    """
+    Completes the given waiters with an error result
+    """
+    with condition:
+        for waiter in nfvo_waiters:
+            waiter["result"] = {"error": reason}
+            waiter["done"] = True
+
+
+def poll_nfvo(nfvo_id, nfvo_waiters):
+    """
+    Gets the status of the NSs of an NFVO and completes the waiters of the NSs that are
+    ready, terminated or failed
+    """
+    nfvo_obj = adapterUtils.get("nfvo", nfvo_id)
+    if not nfvo_obj:
+        fail(nfvo_waiters, f"NFVO {nfvo_id} was not found")
+        return
+    ns_ids = list({waiter["ns_id"] for waiter in nfvo_waiters})
+    nsrs = {nsr["_id"]: nsr for nsr in nfvo_obj.getNsrList(ns_ids)}
+    ready = [
+        waiter["ns_id"]
+        for waiter in nfvo_waiters
+        if waiter["kind"] == "ready" and waiter["ns_id"] in nsrs and ns_ready(nsrs[waiter["ns_id"]])
+    ]
+    # Get the VNFRs of all the NSs that became ready at once
+    vnfrs = {}
+    if ready:
+        for vnfr in nfvo_obj.getVnfrList(ready):
+            vnfrs[vnfr["_id"]] = vnfr
+    now = time.time()
+    with condition:
+        for waiter in nfvo_waiters:
+            if waiter["kind"] == "terminated" and waiter["ns_id"] not in nsrs:
+                waiter["result"] = {"terminated_at": now}
+                waiter["done"] = True
+            elif waiter["kind"] == "ready" and waiter["ns_id"] in ready:
+                nsr = nsrs[waiter["ns_id"]]
+                waiter["result"] = {
+                    "nsr": nsr,
+                    "vnfr_list": [
+                        vnfrs[vnfr_id]
+                        for vnfr_id in nsr["constituent-vnfr-ref"]
+                        if vnfr_id in vnfrs
+                    ],
+                    "ready_at": now,
+                }
+                waiter["done"] = True
+            elif waiter["kind"] == "ready" and waiter["ns_id"] not in nsrs:
+                waiter["result"] = {"error": "NS was not found"}
+                waiter["done"] = True
+            elif waiter["kind"] == "ready" and ns_failed(nsrs[waiter["ns_id"]]):
+                nsr = nsrs[waiter["ns_id"]]
+                waiter["result"] = {
+                    "error": "NS status: {0}, config status: {1}".format(
+                        nsr["operational-status"], nsr["config-status"]
+                    )
+                }
+                waiter["done"] = True
+
+
+def poll_loop():
+    """
+    Polls the NFVOs while there are NSs to wait for
+    The interval between the polls is doubled after every round and it is reset when
+    new NSs are added
+    """
+    interval = POLL_MIN_INTERVAL
+    while True:
+        if wakeup.wait(timeout=interval):
+            wakeup.clear()
+            interval = POLL_MIN_INTERVAL
+            time.sleep(interval)
+        with condition:
+            current = list(waiters)
+        if not current:
+            continue
+        nfvo_waiters = {}
+        for waiter in current:
+            nfvo_waiters.setdefault(waiter["nfvo_id"], []).append(waiter)
+        for nfvo_id, ns_waiters in nfvo_waiters.items():
+            try:
+                poll_nfvo(nfvo_id, ns_waiters)
+            except Exception as e:
+                logger.warning(f"Failed to get the NS status from NFVO {nfvo_id}: {e}")
+        with condition:
+            waiters[:] = [waiter for waiter in waiters if not waiter["done"]]
+            condition.notify_all()
+        interval = min(interval * 2, POLL_MAX_INTERVAL)
+
+
+def wait(ns_list, kind, timeout=WAIT_TIMEOUT):
+    """
+    Blocks until every NS of the list reaches the given state, fails or times out
+    ns_list: A list of (nfvo id, NS id on the NFVO) pairs
+    Returns the result of each NS, by (nfvo id, NS id)
+    """
+    global poller_thread
+
+    new_waiters = [
+        {"nfvo_id": nfvo_id, "ns_id": ns_id, "kind": kind, "done": False, "result": None}
+        for nfvo_id, ns_id in ns_list
+    ]
+    if not new_waiters:
+        return {}
+    with condition:
+        waiters.extend(new_waiters)
+        if poller_thread is None or not poller_thread.is_alive():
+            poller_thread = threading.Thread(target=poll_loop, name="ns-poller", daemon=True)
+            poller_thread.start()
+        wakeup.set()
+        deadline = time.time() + timeout
+        while not all(waiter["done"] for waiter in new_waiters):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                for waiter in new_waiters:
+                    if not waiter["done"]:
+                        waiter["result"] = {"error": f"Timeout after {timeout} seconds"}
+                        waiter["done"] = True
+                waiters[:] = [waiter for waiter in waiters if not waiter["done"]]
+                break
+            condition.wait(timeout=remaining)
+    return {(waiter["nfvo_id"], waiter["ns_id"]): waiter["result"] for waiter in new_waiters}
+
+
+def wait_ready(ns_list):
+    """
+    Blocks until every NS of the list is running and configured
+    Returns the NSR, the VNFRs and the time that each NS was found ready, or the error
+    """
+    return wait(ns_list, "ready")
+
+
+def wait_terminated(ns_list):
+    """
+    Blocks until every NS of the list is deleted from its NFVO
+    Returns the time that each NS was found deleted, or the error
+    """
+    return wait(ns_list, "terminated")
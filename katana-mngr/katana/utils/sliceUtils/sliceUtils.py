@@ -1,11 +1,17 @@
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.nfvoUtils import osmUtils
-import pickle
+from katana.utils.placementUtils import placementUtils
+from katana.utils.pollerUtils import pollerUtils
 import time
+import os
+import socket
 import logging
 import logging.handlers
 import uuid
 import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -20,6 +26,24 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
+# Max number of NSs that are instantiated on the NFVOs at the same time
+NS_MAX_WORKERS = 10
+# Max number of VIMs where the tenants of a slice are created at the same time
+VIM_MAX_WORKERS = 10
+
+# Seconds that a katana-mngr process holds a slice without renewing its lease
+LEASE_TIME = 60
+# Times that the interrupted deployment of a slice is resumed before it is removed
+MAX_RESUME_ATTEMPTS = 3
+# The slice statuses of unfinished deployments and deletions
+UNFINISHED_STATUS = ("init", "Placement", "Provisioning", "Activation", "Terminating")
+# Fields of the slice document that are not part of the slice state
+LEASE_KEYS = ("lease", "resume_attempts")
+# Seconds that a GST is kept after the last slice that uses it is deleted
+GST_RETENTION = int(os.getenv("KATANA_GST_RETENTION", 7 * 86400))
+# The id of this katana-mngr process
+WORKER_ID = "{0}-{1}".format(socket.gethostname(), os.getpid())
+
 NEST_KEYS_OBJ = (
     "sst",
     "shared",
@@ -33,6 +57,7 @@ NEST_KEYS_OBJ = (
     "positional_support",
     "device_velocity",
     "terminal_density",
+    "gst_id",
 )
 
 NEST_KEYS_LIST = (
@@ -46,12 +71,79 @@ NEST_KEYS_LIST = (
 )
 
 
-def ns_details(ns_list, edge_loc, vim_dict, total_ns_list):
+def path_keys(*docs):
+    """
+    Checks if the keys of the given sub-documents can be used in a dot notation path
+    """
+    keys = [key for doc in docs for key in doc]
+    return bool(keys) and all(
+        isinstance(key, str) and key and "." not in key and not key.startswith("$")
+        for key in keys
+    )
+
+
+def diff_fields(old, new, prefix=""):
+    """
+    Compares two versions of a document
+    Returns the fields (in dot notation) that must be set and the fields that must be
+    removed in order to turn the old version to the new one
+    """
+    set_fields = {}
+    unset_fields = []
+    for key, value in new.items():
+        path = prefix + str(key)
+        try:
+            old_value = old[key]
+        except KeyError:
+            set_fields[path] = value
+            continue
+        if isinstance(value, dict) and isinstance(old_value, dict) and path_keys(value, old_value):
+            sub_set, sub_unset = diff_fields(old_value, value, path + ".")
+            set_fields.update(sub_set)
+            unset_fields.extend(sub_unset)
+        elif value != old_value:
+            set_fields[path] = value
+    for key in old:
+        if key not in new:
+            unset_fields.append(prefix + str(key))
+    return set_fields, unset_fields
+
+
+class SliceStateWriter:
+    """
+    Persists the state of a slice in the db
+    Changes are kept in memory and on every write only the fields that changed since
+    the previous write are sent, as a partial update
+    """
+
+    def __init__(self, nest, stored):
+        """
+        Initialize an object of the class
+        nest: The slice document that is being modified
+        stored: The version of the slice document that is currently in the db
+        """
+        self.nest = nest
+        self.stored = copy.deepcopy(stored)
+
+    def write(self):
+        """
+        Send the pending changes to the db
+        """
+        set_fields, unset_fields = diff_fields(self.stored, self.nest)
+        # The _id of a document cannot be changed
+        set_fields.pop("_id", None)
+        if not set_fields and not unset_fields:
+            return
+        mongoUtils.update_fields("slice", self.nest["_id"], set_fields, unset_data=unset_fields)
+        self.stored = copy.deepcopy(self.nest)
+
+
+def ns_details(ns_list, edge_loc, vim_dict, total_ns_list, slice_id):
     """
     Get details for the NS that are part of the slice
     A) Find the nsd details for each NS
     B) Replace placement value with location
-    C) Get the VIM for each NS
+    C) Get the VIM for each NS, based on the available resources
     """
     pop_list = []
     for ns in ns_list:
@@ -72,13 +164,12 @@ def ns_details(ns_list, edge_loc, vim_dict, total_ns_list):
             # Bootstrap the NFVO to check for NSDs that are not in mongo
             # If again is not found, check if NS is optional.
             # If it is just remove it, else error
-            nfvo_obj_json = mongoUtils.find("nfvo_obj", {"id": new_ns["nfvo-id"]})
-            if not nfvo_obj_json:
+            nfvo = adapterUtils.get("nfvo", new_ns["nfvo-id"])
+            if not nfvo:
                 # Error handling: There is no OSM for that ns -
                 # Stop and return
                 logger.error("There is no NFVO with id {}".format(new_ns["nfvo-id"]))
                 return 1, []
-            nfvo = pickle.loads(nfvo_obj_json["obj"])
             nfvo.bootstrapNfvo()
             nsd = mongoUtils.find("nsd", {"nsd-id": new_ns["nsd-id"], "nfvo_id": new_ns["nfvo-id"]})
             if not nsd and ns.get("optional", False):
@@ -103,9 +194,11 @@ def ns_details(ns_list, edge_loc, vim_dict, total_ns_list):
             # Error handling: There is no VIM at that location
             logger.error(f"VIM not found in location {loc}")
             return 1, []
-        # TODO: Check the available resources and select vim
-        # Temporary use the first element
-        selected_vim = get_vim[0]["id"]
+        selected_vim = placementUtils.select_vim(get_vim, nsd["flavor"], slice_id)
+        if not selected_vim:
+            # Error handling: There is no VIM with enough resources at that location
+            logger.error(f"Not enough resources for NS {new_ns['ns-name']} in location {loc}")
+            return 1, []
         new_ns["vims"].append(selected_vim)
         try:
             vim_dict[selected_vim]["ns_list"].append(new_ns["ns-name"])
@@ -132,11 +225,139 @@ def ns_details(ns_list, edge_loc, vim_dict, total_ns_list):
     return 0, pop_list
 
 
-def add_slice(nest_req):
+def instantiate_ns(ns, vim_dict):
     """
-    Creates the network slice
+    Instantiates a NS of the slice on its NFVO
+    Returns the NS id on the NFVO
+    """
+    target_nfvo_obj = adapterUtils.get("nfvo", ns["nfvo-id"])
+    selected_vim = ns["placement_loc"]["vim"]
+    nfvo_vim_account = vim_dict[selected_vim]["nfvo_vim_account"][ns["nfvo-id"]]
+    return target_nfvo_obj.instantiateNs(ns["ns-name"], ns["nsd-id"], nfvo_vim_account)
+
+
+def wait_ns_ready(total_ns_list, ns_inst_info):
+    """
+    Waits until every NS of the slice is running and configured
+    The NSs are polled together with the NSs of the other slices, by the NS poller
+    Adds the IPs of the VNFs in ns_inst_info
+    Returns the deployment time of each ready NS and the errors of the failed NSs
+    """
+    ns_deployment_time = {}
+    ns_errors = {}
+    ns_list = []
+    for ns in total_ns_list:
+        site = ns["placement_loc"]
+        ns_list.append(
+            (ns["nfvo-id"], ns_inst_info[ns["ns-id"]][site["location"]]["nfvo_inst_ns"])
+        )
+    ns_status = pollerUtils.wait_ready(ns_list)
+    for ns, ns_key in zip(total_ns_list, ns_list):
+        status = ns_status[ns_key]
+        if "error" in status:
+            ns_errors[ns["ns-name"]] = status["error"]
+            continue
+        target_nfvo_obj = adapterUtils.get("nfvo", ns["nfvo-id"])
+        ns_deployment_time[ns["ns-name"]] = format(status["ready_at"] - ns["start_time"], ".4f")
+        # Get the IPs of the instantiated NS
+        vnf_list = [target_nfvo_obj.getIPs(vnfr) for vnfr in status["vnfr_list"]]
+        ns_inst_info[ns["ns-id"]][ns["placement_loc"]["location"]]["vnfr"] = vnf_list
+    return ns_deployment_time, ns_errors
+
+
+def new_lease():
+    """
+    Returns a lease of a slice for this katana-mngr process
     """
+    return {"owner": WORKER_ID, "expires": time.time() + LEASE_TIME}
+
+
+def lease_free():
+    """
+    Returns the filter of the slices whose lease can be taken by this katana-mngr process
+    """
+    return [
+        {"lease": {"$exists": False}},
+        {"lease.owner": WORKER_ID},
+        {"lease.expires": {"$lt": time.time()}},
+    ]
+
+
+def claim_slice(slice_id, resume=False):
+    """
+    Marks the slice as handled by this katana-mngr process
+    If resume is set, the slice is claimed only if no other process holds a valid lease
+    Returns the slice document, or None if the slice was not claimed
+    """
+    data = {"_id": slice_id}
+    inc_data = None
+    if resume:
+        data["$or"] = lease_free()
+        inc_data = {"resume_attempts": 1}
+    return mongoUtils.find_and_update("slice", data, {"lease": new_lease()}, inc_data=inc_data)
+
+
+def deployment_stopped(slice_id):
+    """
+    Checks between the steps of a deployment if it must stop
+    Returns "lease" if another katana-mngr process took over the slice, "terminate" if
+    the deletion of the slice was requested, or None
+    """
+    stored = mongoUtils.get("slice", slice_id)
+    if not stored or stored.get("lease", {}).get("owner") != WORKER_ID:
+        return "lease"
+    if stored.get("terminate", False):
+        return "terminate"
+    return None
+
+
+def renew_leases(slice_ids):
+    """
+    Extends the leases of the slices that are handled by this process
+    """
+    if not slice_ids:
+        return
+    mongoUtils.update_all(
+        "slice",
+        {"_id": {"$in": list(slice_ids)}, "lease.owner": WORKER_ID},
+        {"lease.expires": time.time() + LEASE_TIME},
+    )
+
+
+def interrupted_slices(exclude=()):
+    """
+    Finds the slices whose deployment or deletion was interrupted, because the
+    katana-mngr process that handled them stopped, and claims them
+    Returns the claimed slice documents
+    """
+    slice_list = mongoUtils.find_all(
+        "slice",
+        {
+            "$and": [
+                # A running slice with a pending deletion is matched too
+                {"$or": [{"status": {"$in": UNFINISHED_STATUS}}, {"terminate": True}]},
+                {"$or": [{"lease": {"$exists": False}}, {"lease.expires": {"$lt": time.time()}}]},
+            ]
+        },
+    )
+    claimed = []
+    for slice_json in list(slice_list):
+        if slice_json["_id"] in exclude:
+            continue
+        slice_json = claim_slice(slice_json["_id"], resume=True)
+        if slice_json:
+            claimed.append(slice_json)
+    return claimed
 
+
+def register_slice(nest_req):
+    """
+    Stores a new slice request in the db
+    If the slice is already stored (the request was delivered again) nothing is changed
+    """
+    if mongoUtils.get("slice", nest_req["_id"]):
+        logger.warning(f"Slice {nest_req['_id']} is already registered")
+        return
     nest_req["status"] = "init"
     nest_req["created_at"] = time.time()  # unix epoch
     nest_req["deployment_time"] = dict(
@@ -147,45 +368,57 @@ def add_slice(nest_req):
         WAN_Deployment_Time="N/A",
         Radio_Configuration_Time="N/A",
     )
+    nest_req["lease"] = new_lease()
     mongoUtils.add("slice", nest_req)
 
-    # Recreate the NEST with None options where missiong
-    nest = {
-        "_id": nest_req["_id"],
-        "created_at": nest_req["created_at"],
-        "deployment_time": {
-            "Placement_Time": None,
-            "Provisioning_Time": None,
-            "WAN_Deployment_Time": None,
-            "NS_Deployment_Time": None,
-            "Radio_Configuration_Time": None,
-            "Slice_Deployment_Time": None,
-        },
-    }
-    for nest_key in NEST_KEYS_OBJ:
-        nest[nest_key] = nest_req.get(nest_key, None)
-    for nest_key in NEST_KEYS_LIST:
-        nest[nest_key] = nest_req.get(nest_key, [])
-
-    # **** STEP-1: Placement ****
-    nest["status"] = "Placement"
-    nest["conf_comp"] = {"nf": [], "ems": []}
-    mongoUtils.update("slice", nest["_id"], nest)
-    logger.info("Status: Placement")
+
+def register_deletion(slice_id):
+    """
+    Stores a slice deletion request in the db
+    The slice is claimed only if no other process holds a valid lease. Otherwise the
+    process that deploys the slice deletes it after its current step, or the deletion is
+    resumed when the lease expires
+    Returns True if the slice was claimed
+    """
+    mongoUtils.update_fields("slice", slice_id, {"terminate": True})
+    data = {"_id": slice_id, "$or": lease_free()}
+    return mongoUtils.find_and_update("slice", data, {"lease": new_lease()}) is not None
+
+
+def resume_slice(slice_json):
+    """
+    Continues the interrupted deployment or deletion of a slice
+    """
+    if slice_json["status"] == "Terminating" or slice_json.get("terminate", False):
+        logger.info(f"Slice {slice_json['_id']}: Resuming deletion")
+        delete_slice(slice_json)
+    elif slice_json.get("resume_attempts", 0) > MAX_RESUME_ATTEMPTS:
+        logger.error(f"Slice {slice_json['_id']}: Deployment cannot be completed - Removing")
+        delete_slice(slice_json)
+    else:
+        logger.info(
+            f"Slice {slice_json['_id']}: Resuming after {slice_json.get('checkpoint', 'init')}"
+        )
+        add_slice(slice_json)
+
+
+def place_slice(nest, state):
+    """
+    STEP-1: Placement
+    Finds the NSs of the slice and selects the VIMs where they will be deployed
+    """
     placement_start_time = time.time()
 
     # Initiate the lists
     vim_dict = {}
     total_ns_list = []
-    ems_messages = {}
 
     # Get Details for the Network Services
     # i) The extra NS of the slice
     for location in nest["coverage"]:
-        err, _ = ns_details(nest["ns_list"], location, vim_dict, total_ns_list)
+        err, _ = ns_details(nest["ns_list"], location, vim_dict, total_ns_list, nest["_id"])
         if err:
-            delete_slice(nest)
-            return
+            return err
     del nest["ns_list"]
     nest["ns_list"] = copy.deepcopy(total_ns_list)
     # ii) The NS part of the core slice
@@ -197,15 +430,18 @@ def add_slice(nest_req):
                 continue
             try:
                 err, pop_list = ns_details(
-                    connection[key]["ns_list"], connection[key]["location"], vim_dict, total_ns_list
+                    connection[key]["ns_list"],
+                    connection[key]["location"],
+                    vim_dict,
+                    total_ns_list,
+                    nest["_id"],
                 )
                 if pop_list:
                     connection[key]["ns_list"] = [
                         x for x in connection[key]["ns_list"] if x not in pop_list
                     ]
                 if err:
-                    delete_slice(nest)
-                    return
+                    return err
                 inst_functions[connection[key]["_id"]] = connection[key]
             except KeyError:
                 continue
@@ -213,53 +449,72 @@ def add_slice(nest_req):
     nest["vim_list"] = vim_dict
     nest["total_ns_list"] = total_ns_list
     nest["deployment_time"]["Placement_Time"] = format(time.time() - placement_start_time, ".4f")
+    return 0
 
-    # **** STEP-2: Resource Provisioning ****
-    nest["status"] = "Provisioning"
-    mongoUtils.update("slice", nest["_id"], nest)
-    logger.info("Status: Provisioning")
-    prov_start_time = time.time()
 
-    # *** STEP-2a: Cloud ***
-    # *** STEP-2a-i: Create the new tenant/project on the VIM ***
-    for num, (vim, vim_info) in enumerate(vim_dict.items()):
+def tenant_name(num, slice_id):
+    """
+    Returns the name of the tenant of the slice on its num-th VIM
+    """
+    return "vim_{0}_katana_{1}".format(num, slice_id)
+
+
+def provision_vim(slice_id, num, vim, vim_info, recorded):
+    """
+    Creates the tenant of the slice on a VIM and adds it to the NFVOs of the VIM
+    If the tenant was recorded by an interrupted attempt, whatever that attempt created
+    is deleted first
+    Returns the fields of the vim_info that were created and the error, if any
+    Runs in a worker thread, so it does not modify the slice
+    """
+    result = {"nfvo_vim_account": dict(vim_info.get("nfvo_vim_account", {}))}
+    try:
         target_vim = mongoUtils.find("vim", {"id": vim})
-        target_vim_obj = pickle.loads(mongoUtils.find("vim_obj", {"id": vim})["obj"])
-        # Define project parameters
-        tenant_project_name = "vim_{0}_katana_{1}".format(num, nest["_id"])
-        tenant_project_description = "vim_{0}_katana_{1}".format(num, nest["_id"])
-        tenant_project_user = "vim_{0}_katana_{1}".format(num, nest["_id"])
-        tenant_project_password = "password"
-        # If the vim is Openstack type, set quotas
-        quotas = (
-            vim_info["resources"]
-            if target_vim["type"] == "openstack" or target_vim["type"] == "Openstack"
-            else None
-        )
-        ids = target_vim_obj.create_slice_prerequisites(
-            tenant_project_name,
-            tenant_project_description,
-            tenant_project_user,
-            tenant_project_password,
-            nest["_id"],
-            quotas=quotas,
-        )
-        # Register the tenant to the mongo db
-        target_vim["tenants"][nest["_id"]] = tenant_project_name
-        mongoUtils.update("vim", target_vim["_id"], target_vim)
+        tenant_project_name = tenant_name(num, slice_id)
+        # *** STEP-2a-i: Create the new tenant/project on the VIM ***
+        if "tenant" not in vim_info:
+            target_vim_obj = adapterUtils.get("vim", vim)
+            if recorded:
+                try:
+                    target_vim_obj.delete_proj_user(tenant_project_name)
+                except Exception as e:
+                    logger.info(f"Slice {slice_id}: No previous tenant on VIM {vim}: {e}")
+            # Define project parameters
+            tenant_project_description = tenant_project_name
+            tenant_project_user = tenant_project_name
+            tenant_project_password = "password"
+            # If the vim is Openstack type, set quotas
+            quotas = (
+                vim_info["resources"]
+                if target_vim["type"] == "openstack" or target_vim["type"] == "Openstack"
+                else None
+            )
+            ids = target_vim_obj.create_slice_prerequisites(
+                tenant_project_name,
+                tenant_project_description,
+                tenant_project_user,
+                tenant_project_password,
+                slice_id,
+                quotas=quotas,
+            )
 
-        # STEP-2a-ii: Αdd the new VIM tenant to NFVO
-        if target_vim["type"] == "openstack":
             # Update the config parameter for the tenant
-            config_param = dict(security_groups=ids["secGroupName"])
-        elif target_vim["type"] == "opennebula":
-            config_param = target_vim["config"]
+            if target_vim["type"] == "openstack":
+                config_param = dict(security_groups=ids["secGroupName"])
+            elif target_vim["type"] == "opennebula":
+                config_param = target_vim["config"]
+            else:
+                config_param = {}
+            result["tenant"] = tenant_project_name
+            result["tenant_config"] = config_param
         else:
-            config_param = {}
+            config_param = vim_info["tenant_config"]
 
+        # STEP-2a-ii: Αdd the new VIM tenant to NFVO
         for nfvo_id in vim_info["nfvo_list"]:
-            target_nfvo = mongoUtils.find("nfvo", {"id": nfvo_id})
-            target_nfvo_obj = pickle.loads(mongoUtils.find("nfvo_obj", {"id": nfvo_id})["obj"])
+            if nfvo_id in result["nfvo_vim_account"]:
+                continue
+            target_nfvo_obj = adapterUtils.get("nfvo", nfvo_id)
             vim_id = target_nfvo_obj.addVim(
                 tenant_project_name,
                 target_vim["password"],
@@ -268,32 +523,225 @@ def add_slice(nest_req):
                 target_vim["username"],
                 config_param,
             )
-            vim_info["nfvo_vim_account"] = vim_info.get("nfvo_vim_account", {})
-            vim_info["nfvo_vim_account"][nfvo_id] = vim_id
-            # Register the tenant to the mongo db
-            target_nfvo["tenants"][nest["_id"]] = target_nfvo["tenants"].get(nest["_id"], [])
-            target_nfvo["tenants"][nest["_id"]].append(vim_id)
-            mongoUtils.update("nfvo", target_nfvo["_id"], target_nfvo)
-
-    mongoUtils.update("slice", nest["_id"], nest)
-    # *** STEP-2b: WAN ***
+            result["nfvo_vim_account"][nfvo_id] = vim_id
+    except Exception as e:
+        return result, e
+    return result, None
+
+
+def provision_cloud(nest, state):
+    """
+    STEP-2a: Cloud
+    Creates the tenants of the slice on all the VIMs in parallel and adds them to the NFVOs
+    The tenants and VIM accounts of every VIM are stored as soon as the VIM is done, so
+    they are not created again if the step is resumed
+    """
+    prov_start_time = time.time()
+    vim_dict = nest["vim_list"]
+    failed_vims = []
+    # Register the new tenants to the VIMs before they are created, so they are deleted with
+    # the slice even if the step is interrupted
+    tenant_key = f"tenants.{nest['_id']}"
+    new_tenants = {
+        vim: tenant_name(num, nest["_id"])
+        for num, (vim, vim_info) in enumerate(vim_dict.items())
+        if "tenant" not in vim_info
+    }
+    recorded = {
+        target_vim["id"]
+        for target_vim in mongoUtils.find_all(
+            "vim", {"id": {"$in": list(new_tenants)}, tenant_key: {"$exists": True}}
+        )
+    }
+    mongoUtils.bulk_update(
+        "vim",
+        [({"id": vim}, {"$set": {tenant_key: tenant}}) for vim, tenant in new_tenants.items()],
+    )
+    workers = min(len(vim_dict), VIM_MAX_WORKERS) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                provision_vim, nest["_id"], num, vim, vim_info, vim in recorded
+            ): vim
+            for num, (vim, vim_info) in enumerate(vim_dict.items())
+        }
+        for future in as_completed(futures):
+            vim = futures[future]
+            vim_info = vim_dict[vim]
+            result, error = future.result()
+            vim_info.update(result)
+            state.write()
+            if error:
+                logger.error(f"Slice {nest['_id']}: Provisioning on VIM {vim} failed: {error}")
+                failed_vims.append(vim)
+    # Register the VIM accounts to the NFVOs with one bulk write
+    # $addToSet is used, so the accounts of a resumed step are not added twice
+    nfvo_accounts = {}
+    for vim_info in vim_dict.values():
+        for nfvo_id, vim_id in vim_info.get("nfvo_vim_account", {}).items():
+            nfvo_accounts.setdefault(nfvo_id, []).append(vim_id)
+    mongoUtils.bulk_update(
+        "nfvo",
+        [
+            ({"id": nfvo_id}, {"$addToSet": {f"tenants.{nest['_id']}": {"$each": vim_ids}}})
+            for nfvo_id, vim_ids in nfvo_accounts.items()
+        ],
+    )
+    nest["deployment_time"]["Provisioning_Time"] = format(time.time() - prov_start_time, ".4f")
+    return 1 if failed_vims else 0
+
+
+def provision_wan(nest, state):
+    """
+    STEP-2b: WAN
+    Creates the WAN slice on the WIM
+    """
     if mongoUtils.count("wim") <= 0:
         logger.warning("There is no registered WIM")
-    else:
-        wan_start_time = time.time()
-        # Crate the data for the WIM
-        wim_data = {"core_connections": [], "extra_ns": [], "slice_sla": {}}
-        # i) Create the slice_sla data for the WIM
-        wim_data["slice_sla"] = {
-            "network_DL_throughput": nest["network_DL_throughput"],
-            "network_UL_throughput": nest["network_UL_throughput"],
-            "mtu": nest["mtu"],
-        }
-        # ii) Add the connections
-        for connection in nest["connections"]:
-            data = {}
-            for key in connection:
-                key_data = {}
+        return
+    wan_start_time = time.time()
+    # Crate the data for the WIM
+    wim_data = {"core_connections": [], "extra_ns": [], "slice_sla": {}}
+    # i) Create the slice_sla data for the WIM
+    wim_data["slice_sla"] = {
+        "network_DL_throughput": nest["network_DL_throughput"],
+        "network_UL_throughput": nest["network_UL_throughput"],
+        "mtu": nest["mtu"],
+    }
+    # ii) Add the connections
+    for connection in nest["connections"]:
+        data = {}
+        for key in connection:
+            key_data = {}
+            try:
+                ns_l = connection[key]["ns_list"]
+            except KeyError:
+                pass
+            else:
+                key_data["ns"] = []
+                for ns in ns_l:
+                    if ns["placement_loc"] not in key_data["ns"]:
+                        key_data["ns"].append(ns["placement_loc"])
+            try:
+                pnf_l = connection[key]["pnf_list"]
+            except KeyError:
+                pass
+            else:
+                key_data["pnf"] = pnf_l
+            if key_data:
+                data[key] = key_data
+        if data:
+            wim_data["core_connections"].append(data)
+    # iii) Add the extra Network Services
+    for ns in nest["ns_list"]:
+        if ns["placement_loc"] not in wim_data["extra_ns"]:
+            wim_data["extra_ns"].append(ns["placement_loc"])
+    # iV) Add the probes
+    wim_data["probes"] = nest["probe_list"]
+    # Select WIM - Assume that there is only one registered
+    wim_list = list(mongoUtils.index("wim"))
+    target_wim = wim_list[0]
+    target_wim_id = target_wim["id"]
+    target_wim_obj = adapterUtils.get("wim", target_wim_id)
+    target_wim_obj.create_slice(wim_data)
+    nest["wim_data"] = wim_data
+    mongoUtils.update_fields("wim", target_wim["_id"], {f"slices.{nest['_id']}": nest["_id"]})
+    wan_time = time.time() - wan_start_time
+    nest["deployment_time"]["WAN_Deployment_Time"] = format(wan_time, ".4f")
+    # The Provisioning time includes both the Cloud and the WAN
+    nest["deployment_time"]["Provisioning_Time"] = format(
+        float(nest["deployment_time"]["Provisioning_Time"] or 0) + wan_time, ".4f"
+    )
+
+
+def activate_ns(nest, state):
+    """
+    STEP-3a: Cloud
+    Instantiates the NSs of the slice and waits until they are running
+    The instantiated NSs are stored before waiting, so they are not instantiated
+    again if the step is resumed and they are terminated if any NS fails
+    """
+    vim_dict = nest["vim_list"]
+    total_ns_list = nest["total_ns_list"]
+    # Store info about instantiated NSs
+    ns_inst_info = nest.setdefault("ns_inst_info", {})
+    if not isinstance(nest["deployment_time"]["NS_Deployment_Time"], dict):
+        nest["deployment_time"]["NS_Deployment_Time"] = {}
+    # Instantiate all the NSs at once
+    new_ns_list = [ns for ns in total_ns_list if ns["ns-id"] not in ns_inst_info]
+    workers = min(len(new_ns_list), NS_MAX_WORKERS) or 1
+    failed_ns = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for ns in new_ns_list:
+            ns["start_time"] = time.time()
+            futures[executor.submit(instantiate_ns, ns, vim_dict)] = ns
+        for future in as_completed(futures):
+            ns = futures[future]
+            try:
+                nfvo_inst_ns = future.result()
+            except Exception as e:
+                logger.error(
+                    f"Slice {nest['_id']}: Instantiation of NS {ns['ns-name']} failed: {e}"
+                )
+                failed_ns.append(ns["ns-id"])
+                continue
+            ns_inst_info[ns["ns-id"]] = {
+                ns["placement_loc"]["location"]: {"nfvo_inst_ns": nfvo_inst_ns}
+            }
+            nest["conf_comp"]["nf"].append(ns["nsd-id"])
+    # Store the instantiated NSs, so they are terminated if the step failed
+    state.write()
+    if failed_ns:
+        return 1
+
+    # Get the nsr for each service and wait for the activation
+    pending_ns_list = [
+        ns
+        for ns in total_ns_list
+        if "vnfr" not in ns_inst_info[ns["ns-id"]][ns["placement_loc"]["location"]]
+    ]
+    ns_deployment_time, ns_errors = wait_ns_ready(pending_ns_list, ns_inst_info)
+    nest["deployment_time"]["NS_Deployment_Time"].update(ns_deployment_time)
+    if ns_errors:
+        logger.error(f"Slice {nest['_id']}: NSs did not become ready: {ns_errors}")
+        return 1
+
+
+def configure_radio(nest, state):
+    """
+    STEP-3b: Radio Slice Configuration
+    Sends the radio configuration to the EMSs
+    """
+    if mongoUtils.count("ems") <= 0:
+        logger.warning("There is no registered EMS")
+        return
+    ns_inst_info = nest["ns_inst_info"]
+    ems_messages = {}
+    # Add the management IPs for the NS sent ems in ems_messages:
+    ems_radio_data = {
+        "ue_DL_throughput": nest["ue_DL_throughput"],
+        "ue_UL_throughput": nest["ue_UL_throughput"],
+        "group_communication_support": nest["group_communication_support"],
+        "number_of_terminals": nest["number_of_terminals"],
+        "positional_support": nest["positional_support"],
+        "radio_spectrum": nest["radio_spectrum"],
+        "device_velocity": nest["device_velocity"],
+        "terminal_density": nest["terminal_density"],
+    }
+    radio_start_time = time.time()
+    for connection in nest["connections"]:
+        data = {}
+        ems_id_list = []
+        for key in connection:
+            key_data = {}
+            try:
+                ems_id = connection[key]["ems-id"]
+            except KeyError:
+                continue
+            else:
+                if ems_id not in ems_id_list:
+                    ems_id_list.append(ems_id)
                 try:
                     ns_l = connection[key]["ns_list"]
                 except KeyError:
@@ -301,164 +749,206 @@ def add_slice(nest_req):
                 else:
                     key_data["ns"] = []
                     for ns in ns_l:
-                        if ns["placement_loc"] not in key_data["ns"]:
-                            key_data["ns"].append(ns["placement_loc"])
-                try:
-                    pnf_l = connection[key]["pnf_list"]
-                except KeyError:
-                    pass
-                else:
-                    key_data["pnf"] = pnf_l
-                if key_data:
-                    data[key] = key_data
-            if data:
-                wim_data["core_connections"].append(data)
-        # iii) Add the extra Network Services
-        for ns in nest["ns_list"]:
-            if ns["placement_loc"] not in wim_data["extra_ns"]:
-                wim_data["extra_ns"].append(ns["placement_loc"])
-        # iV) Add the probes
-        wim_data["probes"] = nest["probe_list"]
-        # Select WIM - Assume that there is only one registered
-        wim_list = list(mongoUtils.index("wim"))
-        target_wim = wim_list[0]
-        target_wim_id = target_wim["id"]
-        target_wim_obj = pickle.loads(mongoUtils.find("wim_obj", {"id": target_wim_id})["obj"])
-        target_wim_obj.create_slice(wim_data)
-        nest["wim_data"] = wim_data
-        target_wim["slices"][nest["_id"]] = nest["_id"]
-        mongoUtils.update("wim", target_wim["_id"], target_wim)
-        nest["deployment_time"]["WAN_Deployment_Time"] = format(time.time() - wan_start_time, ".4f")
-    nest["deployment_time"]["Provisioning_Time"] = format(time.time() - prov_start_time, ".4f")
+                        try:
+                            ns_info = ns_inst_info[ns["ns-id"]][connection[key]["location"]]
+                        except KeyError:
+                            ns_info = ns_inst_info[ns["ns-id"]]["Core"]
+                        ns_data = {
+                            "name": ns["ns-name"],
+                            "location": ns["placement_loc"]["location"],
+                            "vnf_list": ns_info["vnfr"],
+                        }
+                        key_data["ns"].append(ns_data)
+            try:
+                key_data["pnf"] = connection[key]["pnf_list"]
+            except KeyError:
+                pass
+            if key_data:
+                data[key] = key_data
+        if data:
+            data["slice_sla"] = ems_radio_data
+            for ems_id in ems_id_list:
+                messages = ems_messages.get(ems_id, [])
+                messages.append(data)
+                ems_messages[ems_id] = messages
 
-    # **** STEP-3: Slice Activation Phase****
-    nest["status"] = "Activation"
-    mongoUtils.update("slice", nest["_id"], nest)
-    logger.info("Status: Activation")
-    # *** STEP-3a: Cloud ***
-    # Instantiate NS
-    # Store info about instantiated NSs
-    ns_inst_info = {}
-    nest["deployment_time"]["NS_Deployment_Time"] = {}
-    for ns in total_ns_list:
-        ns["start_time"] = time.time()
-        ns_inst_info[ns["ns-id"]] = {}
-        target_nfvo = mongoUtils.find("nfvo", {"id": ns["nfvo-id"]})
-        target_nfvo_obj = pickle.loads(mongoUtils.find("nfvo_obj", {"id": ns["nfvo-id"]})["obj"])
-        selected_vim = ns["placement_loc"]["vim"]
-        nfvo_vim_account = vim_dict[selected_vim]["nfvo_vim_account"][ns["nfvo-id"]]
-        nfvo_inst_ns = target_nfvo_obj.instantiateNs(ns["ns-name"], ns["nsd-id"], nfvo_vim_account)
-        ns_inst_info[ns["ns-id"]][ns["placement_loc"]["location"]] = {"nfvo_inst_ns": nfvo_inst_ns}
-        nest["conf_comp"]["nf"].append(ns["nsd-id"])
-        time.sleep(4)
-        time.sleep(2)
+    nest["ems_data"] = ems_messages
+    for ems_id, ems_message in ems_messages.items():
+        if ems_id in nest["conf_comp"]["ems"]:
+            # Configured before the step was interrupted
+            continue
+        # Find the EMS
+        target_ems = mongoUtils.find("ems", {"id": ems_id})
+        if not target_ems:
+            # Error handling: There is no such EMS
+            logger.error("EMS {} not found - No configuration".format(ems_id))
+            continue
+        target_ems_obj = adapterUtils.get("ems", ems_id)
+        # Send the message
+        for imessage in ems_message:
+            target_ems_obj.conf_radio(imessage)
+        nest["conf_comp"]["ems"].append(ems_id)
+        state.write()
+    nest["deployment_time"]["Radio_Configuration_Time"] = format(
+        time.time() - radio_start_time, ".4f"
+    )
 
-    # Get the nsr for each service and wait for the activation
-    for ns in total_ns_list:
-        target_nfvo = mongoUtils.find("nfvo", {"id": ns["nfvo-id"]})
-        target_nfvo_obj = pickle.loads(mongoUtils.find("nfvo_obj", {"id": ns["nfvo-id"]})["obj"])
-        site = ns["placement_loc"]
-        nfvo_inst_ns_id = ns_inst_info[ns["ns-id"]][site["location"]]["nfvo_inst_ns"]
-        insr = target_nfvo_obj.getNsr(nfvo_inst_ns_id)
-        while insr["operational-status"] != "running" or insr["config-status"] != "configured":
-            time.sleep(10)
-            insr = target_nfvo_obj.getNsr(nfvo_inst_ns_id)
-        nest["deployment_time"]["NS_Deployment_Time"][ns["ns-name"]] = format(
-            time.time() - ns["start_time"], ".4f"
-        )
-        # Get the IPs of the instantiated NS
-        vnf_list = []
-        vnfr_id_list = target_nfvo_obj.getVnfrId(insr)
-        for ivnfr_id in vnfr_id_list:
-            vnfr = target_nfvo_obj.getVnfr(ivnfr_id)
-            vnf_list.append(target_nfvo_obj.getIPs(vnfr))
-        ns_inst_info[ns["ns-id"]][site["location"]]["vnfr"] = vnf_list
 
-    nest["ns_inst_info"] = ns_inst_info
-    mongoUtils.update("slice", nest["_id"], nest)
+# The steps of the slice deployment: (checkpoint, slice status, step)
+# After every step its checkpoint is stored in the db, so an interrupted deployment
+# continues from the next step
+SLICE_STEPS = (
+    ("Placement", "Placement", place_slice),
+    ("Provisioning", "Provisioning", provision_cloud),
+    ("WAN", "Provisioning", provision_wan),
+    ("Activation", "Activation", activate_ns),
+    ("Radio", "Activation", configure_radio),
+)
+
 
-    # *** STEP-3b: Radio Slice Configuration ***
-    if mongoUtils.count("ems") <= 0:
-        logger.warning("There is no registered EMS")
+def continue_deployment(nest, state):
+    """
+    Checks at a step boundary if the deployment of the slice can continue
+    If the deletion of the slice was requested, the slice is deleted
+    """
+    stop = deployment_stopped(nest["_id"])
+    if stop == "lease":
+        logger.warning(f"Slice {nest['_id']}: Handled by another katana-mngr - Stopping")
+        return False
+    if stop == "terminate":
+        logger.info(f"Slice {nest['_id']}: Deletion requested - Stopping the deployment")
+        state.write()
+        delete_slice(nest)
+        return False
+    return True
+
+
+def add_slice(nest_req):
+    """
+    Creates the network slice
+    If the deployment of the slice was interrupted, it continues from the last checkpoint
+    """
+
+    # Drop the adapters of the components that changed since the last slice
+    adapterUtils.sync()
+
+    stored = mongoUtils.get("slice", nest_req["_id"])
+    if not stored:
+        register_slice(nest_req)
+        stored = mongoUtils.get("slice", nest_req["_id"])
+    if stored.get("terminate", False) or stored["status"] in ("Running", "Terminating", "Error"):
+        logger.warning(f"Slice {stored['_id']}: Status: {stored['status']} - Nothing to deploy")
+        return
+    # The fields of the lease are managed separately
+    stored = {key: value for key, value in stored.items() if key not in LEASE_KEYS}
+
+    if stored.get("checkpoint"):
+        nest = copy.deepcopy(stored)
+        # Reserve the resources of the placement again, if the reservation has expired
+        placementUtils.restore(nest["_id"], nest["vim_list"])
     else:
-        # Add the management IPs for the NS sent ems in ems_messages:
-        ems_radio_data = {
-            "ue_DL_throughput": nest["ue_DL_throughput"],
-            "ue_UL_throughput": nest["ue_UL_throughput"],
-            "group_communication_support": nest["group_communication_support"],
-            "number_of_terminals": nest["number_of_terminals"],
-            "positional_support": nest["positional_support"],
-            "radio_spectrum": nest["radio_spectrum"],
-            "device_velocity": nest["device_velocity"],
-            "terminal_density": nest["terminal_density"],
+        # Drop any reservations of a previous attempt
+        placementUtils.release(stored["_id"])
+        # Recreate the NEST with None options where missiong
+        nest = {
+            "_id": stored["_id"],
+            "created_at": stored["created_at"],
+            "deployment_time": {
+                "Placement_Time": None,
+                "Provisioning_Time": None,
+                "WAN_Deployment_Time": None,
+                "NS_Deployment_Time": None,
+                "Radio_Configuration_Time": None,
+                "Slice_Deployment_Time": None,
+            },
+            "conf_comp": {"nf": [], "ems": []},
         }
-        radio_start_time = time.time()
-        for connection in nest["connections"]:
-            data = {}
-            ems_id_list = []
-            for key in connection:
-                key_data = {}
-                try:
-                    ems_id = connection[key]["ems-id"]
-                except KeyError:
-                    continue
-                else:
-                    if ems_id not in ems_id_list:
-                        ems_id_list.append(ems_id)
-                    try:
-                        ns_l = connection[key]["ns_list"]
-                    except KeyError:
-                        pass
-                    else:
-                        key_data["ns"] = []
-                        for ns in ns_l:
-                            try:
-                                ns_info = ns_inst_info[ns["ns-id"]][connection[key]["location"]]
-                            except KeyError:
-                                ns_info = ns_inst_info[ns["ns-id"]]["Core"]
-                            ns_data = {
-                                "name": ns["ns-name"],
-                                "location": ns["placement_loc"]["location"],
-                                "vnf_list": ns_info["vnfr"],
-                            }
-                            key_data["ns"].append(ns_data)
-                try:
-                    key_data["pnf"] = connection[key]["pnf_list"]
-                except KeyError:
-                    pass
-                if key_data:
-                    data[key] = key_data
-            if data:
-                data["slice_sla"] = ems_radio_data
-                for ems_id in ems_id_list:
-                    messages = ems_messages.get(ems_id, [])
-                    messages.append(data)
-                    ems_messages[ems_id] = messages
-
-        for ems_id, ems_message in ems_messages.items():
-            # Find the EMS
-            target_ems = mongoUtils.find("ems", {"id": ems_id})
-            if not target_ems:
-                # Error handling: There is no such EMS
-                logger.error("EMS {} not found - No configuration".format(ems_id))
-                continue
-            target_ems_obj = pickle.loads(mongoUtils.find("ems_obj", {"id": ems_id})["obj"])
-            # Send the message
-            for imessage in ems_message:
-                target_ems_obj.conf_radio(imessage)
-            nest["conf_comp"]["ems"].append(ems_id)
-        nest["ems_data"] = ems_messages
-        nest["deployment_time"]["Radio_Configuration_Time"] = format(
-            time.time() - radio_start_time, ".4f"
-        )
+        for nest_key in NEST_KEYS_OBJ:
+            nest[nest_key] = stored.get(nest_key, None)
+        for nest_key in NEST_KEYS_LIST:
+            nest[nest_key] = stored.get(nest_key, [])
+    state = SliceStateWriter(nest, stored)
+
+    checkpoints = [step[0] for step in SLICE_STEPS]
+    completed = checkpoints.index(nest["checkpoint"]) + 1 if nest.get("checkpoint") else 0
+    for checkpoint, status, step in SLICE_STEPS[completed:]:
+        if not continue_deployment(nest, state):
+            return
+        if nest.get("status") != status:
+            nest["status"] = status
+            state.write()
+            logger.info(f"Slice {nest['_id']}: Status: {status}")
+        if step(nest, state):
+            # Error handling: The step failed - Remove the slice
+            state.write()
+            delete_slice(nest)
+            return
+        nest["checkpoint"] = checkpoint
+        state.write()
+
+    if not continue_deployment(nest, state):
+        return
 
     # *** STEP-4: Finalize ***
-    logger.info("Status: Running")
+    logger.info(f"Slice {nest['_id']}: Status: Running")
+    placementUtils.complete(nest["_id"])
     nest["status"] = "Running"
     nest["deployment_time"]["Slice_Deployment_Time"] = format(
         time.time() - nest["created_at"], ".4f"
     )
-    mongoUtils.update("slice", nest["_id"], nest)
+    state.write()
+
+
+def terminate_ns(nfvo_id, nfvo_inst_ns):
+    """
+    Terminates a NS of the slice on its NFVO
+    """
+    target_nfvo_obj = adapterUtils.get("nfvo", nfvo_id)
+    target_nfvo_obj.deleteNs(nfvo_inst_ns)
+
+
+def teardown_vim(slice_id, vim, vim_info, delete_tenant):
+    """
+    Deletes the VIM accounts of the slice tenant from the NFVOs and then the tenant from the VIM
+    Returns the deleted (nfvo id, VIM account) pairs, if the tenant was deleted and the errors
+    Runs in a worker thread, so it does not modify the NFVO and VIM documents
+    The accounts are deleted even if they are not in the NFVO documents, as the step that
+    stores them may have been interrupted. Accounts that are already deleted are skipped
+    by the NFVO. A failed account does not stop the deletion of the rest
+    """
+    removed_accounts = []
+    tenant_removed = False
+    errors = []
+    # Delete the new tenants from the NFVO
+    for nfvo, vim_account in vim_info.get("nfvo_vim_account", {}).items():
+        try:
+            target_nfvo_obj = adapterUtils.get("nfvo", nfvo)
+            target_nfvo_obj.deleteVim(vim_account)
+        except Exception as e:
+            errors.append(e)
+            continue
+        removed_accounts.append((nfvo, vim_account))
+    # Delete the tenants from the vim
+    if not delete_tenant:
+        return removed_accounts, tenant_removed, errors
+    try:
+        # Get the VIM
+        target_vim = mongoUtils.find("vim", {"id": vim})
+        if not target_vim:
+            logger.warning("VIM id {} was not found - Tenant won't be deleted".format(vim))
+        elif slice_id in target_vim.get("tenants", {}):
+            target_vim_obj = adapterUtils.get("vim", vim)
+            try:
+                target_vim_obj.delete_proj_user(target_vim["tenants"][slice_id])
+            except Exception as e:
+                if "tenant" in vim_info:
+                    raise
+                # The tenant was registered, but its creation was not completed
+                logger.warning(f"Slice {slice_id}: Tenant on VIM {vim} was not deleted: {e}")
+            tenant_removed = True
+    except Exception as e:
+        errors.append(e)
+    return removed_accounts, tenant_removed, errors
 
 
 def delete_slice(slice_json):
@@ -466,10 +956,21 @@ def delete_slice(slice_json):
     Deletes the given network slice
     """
 
+    # Drop the adapters of the components that changed since the last slice
+    adapterUtils.sync()
+
+    # Use the latest state of the slice, as stored by the deployment
+    slice_id = slice_json["_id"]
+    slice_json = mongoUtils.get("slice", slice_id)
+    if not slice_json:
+        logger.warning(f"Slice {slice_id} does not exist")
+        return
+    slice_json.setdefault("conf_comp", {"nf": [], "ems": []})
+
     # Update the slice status in mongo db
     slice_json["status"] = "Terminating"
-    mongoUtils.update("slice", slice_json["_id"], slice_json)
-    logger.info("Status: Terminating")
+    mongoUtils.update_fields("slice", slice_json["_id"], {"status": "Terminating"})
+    logger.info(f"Slice {slice_json['_id']}: Status: Terminating")
 
     # *** Step-1: Radio Slice Configuration ***
     if slice_json["conf_comp"]["ems"]:
@@ -482,7 +983,7 @@ def delete_slice(slice_json):
                     # Error handling: There is no such EMS
                     logger.error("EMS {} not found - No configuration".format(ems_id))
                     continue
-                target_ems_obj = pickle.loads(mongoUtils.find("ems_obj", {"id": ems_id})["obj"])
+                target_ems_obj = adapterUtils.get("ems", ems_id)
                 target_ems_obj.del_slice(ems_message)
     else:
         logger.info("There was not EMS configuration")
@@ -495,23 +996,30 @@ def delete_slice(slice_json):
         if wim_list:
             target_wim = wim_list[0]
             target_wim_id = target_wim["id"]
-            target_wim_obj = pickle.loads(mongoUtils.find("wim_obj", {"id": target_wim_id})["obj"])
-            target_wim_obj.del_slice(wim_data)
-            del target_wim["slices"][slice_json["_id"]]
-            mongoUtils.update("wim", target_wim["_id"], target_wim)
+            if slice_json["_id"] in target_wim["slices"]:
+                target_wim_obj = adapterUtils.get("wim", target_wim_id)
+                target_wim_obj.del_slice(wim_data)
+                mongoUtils.update_fields(
+                    "wim", target_wim["_id"], {}, unset_data=[f"slices.{slice_json['_id']}"]
+                )
         else:
             logger.warning("Cannot find WIM - WAN Slice will not be deleted")
     else:
         logger.info("There was no WIM configuration")
 
     # *** Step-3: Cloud ***
-    if slice_json["conf_comp"]["nf"]:
+    # The tenants are created before the NSs, so check the VIMs of the slice
+    teardown_complete = True
+    if slice_json.get("vim_list"):
         vim_error_list = []
+        ns_terminating = []
         try:
             total_ns_list = slice_json["total_ns_list"]
-            ns_inst_info = slice_json["ns_inst_info"]
+            ns_inst_info = slice_json.get("ns_inst_info", {})
             for ns in total_ns_list:
-                if ns["nsd-id"] not in slice_json["conf_comp"]["nf"]:
+                if ns["nsd-id"] not in slice_json["conf_comp"]["nf"] or (
+                    ns["ns-id"] not in ns_inst_info
+                ):
                     logger.error(f"{ns['nsd-id']} was not instantiated successfully")
                     continue
                 # Get the NFVO
@@ -523,57 +1031,126 @@ def delete_slice(slice_json):
                     )
                     vim_error_list += ns["vims"]
                     continue
-                target_nfvo_obj = pickle.loads(
-                    mongoUtils.find("nfvo_obj", {"id": ns["nfvo-id"]})["obj"]
-                )
-                # Stop the NS
                 nfvo_inst_ns = ns_inst_info[ns["ns-id"]][ns["placement_loc"]["location"]][
                     "nfvo_inst_ns"
                 ]
-                target_nfvo_obj.deleteNs(nfvo_inst_ns)
-                while True:
-                    if target_nfvo_obj.checkNsLife(nfvo_inst_ns):
-                        break
-                    time.sleep(5)
+                ns_terminating.append((nfvo_id, nfvo_inst_ns))
         except KeyError as e:
             logger.warning(f"Error, not all NSs started or terminated correctly {e}")
 
-        try:
-            vim_dict = slice_json["vim_list"]
-            for vim, vim_info in vim_dict.items():
-                # Delete the new tenants from the NFVO
-                for nfvo, vim_account in vim_info["nfvo_vim_account"].items():
-                    # Get the NFVO
-                    target_nfvo = mongoUtils.find("nfvo", {"id": nfvo})
-                    target_nfvo_obj = pickle.loads(mongoUtils.find("nfvo_obj", {"id": nfvo})["obj"])
-                    # Delete the VIM and update nfvo db
-                    target_nfvo_obj.deleteVim(vim_account)
-                    target_nfvo["tenants"][slice_json["_id"]].remove(vim_account)
-                    if len(target_nfvo["tenants"][slice_json["_id"]]) == 0:
-                        del target_nfvo["tenants"][slice_json["_id"]]
-                    mongoUtils.update("nfvo", target_nfvo["_id"], target_nfvo)
-                # Delete the tenants from every vim
-                if vim not in vim_error_list:
-                    # Get the VIM
-                    target_vim = mongoUtils.find("vim", {"id": vim})
-                    if not target_vim:
-                        logger.warning(
-                            "VIM id {} was not found - Tenant won't be deleted".format(vim)
-                        )
-                        continue
-                    target_vim_obj = pickle.loads(mongoUtils.find("vim_obj", {"id": vim})["obj"])
-                    target_vim_obj.delete_proj_user(target_vim["tenants"][slice_json["_id"]])
-                    del target_vim["tenants"][slice_json["_id"]]
-                    mongoUtils.update("vim", target_vim["_id"], target_vim)
-        except KeyError as e:
-            logger.warning(f"Error, not all tenants created or removed correctly {e}")
+        # Stop all the NSs at once and wait until they are terminated
+        workers = min(len(ns_terminating), NS_MAX_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(terminate_ns, nfvo_id, nfvo_inst_ns): (nfvo_id, nfvo_inst_ns)
+                for nfvo_id, nfvo_inst_ns in ns_terminating
+            }
+            for future, (nfvo_id, nfvo_inst_ns) in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Error, NS {nfvo_inst_ns} was not terminated {e}")
+                    ns_terminating.remove((nfvo_id, nfvo_inst_ns))
+        for (nfvo_id, nfvo_inst_ns), status in pollerUtils.wait_terminated(
+            ns_terminating
+        ).items():
+            if "error" in status:
+                # Keep the slice, so the NS is terminated again on the next deletion
+                teardown_complete = False
+                logger.warning(f"Error, NS {nfvo_inst_ns} was not terminated {status['error']}")
+
+        # Delete the VIM accounts and the tenants of all the VIMs at once
+        vim_dict = slice_json["vim_list"]
+        removed = {}
+        removed_tenants = []
+        workers = min(len(vim_dict), VIM_MAX_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    teardown_vim, slice_json["_id"], vim, vim_info, vim not in vim_error_list
+                ): vim
+                for vim, vim_info in vim_dict.items()
+            }
+            for future in as_completed(futures):
+                removed_accounts, tenant_removed, errors = future.result()
+                for nfvo, vim_account in removed_accounts:
+                    removed.setdefault(nfvo, []).append(vim_account)
+                if tenant_removed:
+                    removed_tenants.append(futures[future])
+                if errors:
+                    teardown_complete = False
+                    logger.warning(
+                        f"Error, not all tenants removed correctly from VIM {futures[future]}"
+                        f" {errors}"
+                    )
+        # Remove the deleted VIM accounts from the NFVOs with one bulk write
+        # The slice is removed from the tenants of an NFVO when it has no more VIM accounts
+        tenant_key = f"tenants.{slice_json['_id']}"
+        updates = []
+        for nfvo, vim_accounts in removed.items():
+            updates.append(({"id": nfvo}, {"$pull": {tenant_key: {"$in": vim_accounts}}}))
+            updates.append(
+                ({"id": nfvo, tenant_key: {"$size": 0}}, {"$unset": {tenant_key: ""}})
+            )
+        mongoUtils.bulk_update("nfvo", updates)
+        # Remove the deleted tenants from the VIMs with one bulk write
+        if removed_tenants:
+            mongoUtils.bulk_update(
+                "vim", [({"id": {"$in": removed_tenants}}, {"$unset": {tenant_key: ""}})]
+            )
     else:
         logger.info("No NFs on the slice")
 
+    if not teardown_complete:
+        # Keep the slice, so its deletion can be requested again
+        logger.error(f"Slice {slice_json['_id']}: Status: Error - Deletion was not completed")
+        mongoUtils.update_fields(
+            "slice", slice_json["_id"], {"status": "Error"}, unset_data=["terminate"]
+        )
+        return
+
     mongoUtils.delete("slice", slice_json["_id"])
+    placementUtils.release(slice_json["_id"])
 
     # Remove Slice from the tenants list on functions
-    for func_id in slice_json["functions"]:
-        ifunc = mongoUtils.get("func", func_id)
-        ifunc["tenants"].remove(slice_json["_id"])
-        mongoUtils.update("func", func_id, ifunc)
+    mongoUtils.bulk_update(
+        "func",
+        [
+            (
+                {"_id": {"$in": slice_json["functions"]}},
+                {"$pull": {"tenants": slice_json["_id"]}},
+            )
+        ],
+    )
+
+    # Release the GST of the slice - It expires after GST_RETENTION if no other slice uses it
+    # The GSTs of the slices that were created before the GSTs were stored by content hash
+    # are stored under the id of the slice
+    gst_id = slice_json.get("gst_id") or slice_json["_id"]
+    expire_at = datetime.utcnow() + timedelta(seconds=GST_RETENTION)
+    mongoUtils.bulk_update(
+        "gst",
+        [
+            ({"_id": gst_id}, {"$pull": {"slices": slice_json["_id"]}}),
+            ({"_id": gst_id, "slices": {"$size": 0}}, {"$set": {"expire_at": expire_at}}),
+        ],
+    )
+
+
+def migrate_gsts():
+    """
+    Converts the GSTs that were stored under the id of their slice, before the GSTs were
+    stored by content hash, so they are released and expire like the rest
+    The converted GSTs are not matched again, so it can run on every start up
+    """
+    expire_at = datetime.utcnow() + timedelta(seconds=GST_RETENTION)
+    updates = []
+    for gst in mongoUtils.find_all("gst", {"slices": {"$exists": False}}):
+        if mongoUtils.get("slice", gst["_id"]):
+            update = {"$set": {"slices": [gst["_id"]]}}
+        else:
+            update = {"$set": {"slices": [], "expire_at": expire_at}}
+        updates.append(({"_id": gst["_id"], "slices": {"$exists": False}}, update))
+    mongoUtils.bulk_update("gst", updates)
+    if updates:
+        logger.info(f"Converted {len(updates)} GSTs that were stored by slice id")
@@ -0,0 +1,85 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import logging.handlers
+import threading
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = logging.handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+
+class SliceWorkerPool:
+    """
+    Runs slice workflows on a pool of worker threads.
+    Workflows of different slices run in parallel, while the actions of the same
+    slice are executed one after the other, in the order they were submitted
+    """
+
+    def __init__(self, max_workers):
+        """
+        Initialize an object of the class
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="slice-worker"
+        )
+        self.lock = threading.Lock()
+        # Actions waiting for a previous action of the same slice to finish
+        self.pending = {}
+
+    def submit(self, slice_id, func, *args):
+        """
+        Schedule func(*args) for the given slice
+        """
+        with self.lock:
+            if slice_id in self.pending:
+                # There is a running action for that slice - Wait for it
+                self.pending[slice_id].append((func, args))
+                logger.info(f"Slice {slice_id} is busy - Action queued")
+                return
+            self.pending[slice_id] = deque()
+        self.executor.submit(self._run, slice_id, func, args)
+
+    def _run(self, slice_id, func, args):
+        """
+        Run an action and then start the next queued action of the same slice
+        """
+        while True:
+            try:
+                func(*args)
+            except Exception as e:
+                logger.exception(f"Slice {slice_id}: Action {func.__name__} failed: {e}")
+            with self.lock:
+                queue = self.pending[slice_id]
+                if not queue:
+                    del self.pending[slice_id]
+                    return
+                func, args = queue.popleft()
+
+    def busy(self):
+        """
+        Returns the number of slices with running or queued actions
+        """
+        with self.lock:
+            return len(self.pending)
+
+    def active(self):
+        """
+        Returns the ids of the slices with running or queued actions
+        """
+        with self.lock:
+            return list(self.pending)
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting new actions and wait for the running ones
+        """
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,20 @@
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# The db module connects to mongo when it is imported - The unit tests use a mock instead
+mongo_mock = mock.MagicMock()
+sys.modules["katana.shared_utils.mongoUtils.mongoUtils"] = mongo_mock
+
+
+@pytest.fixture
+def mongo():
+    """
+    Returns the mock of the db module, without the calls of the previous tests
+    """
+    mongo_mock.reset_mock(return_value=True, side_effect=True)
+    return mongo_mock
@@ -0,0 +1,113 @@
+from katana.utils.placementUtils import placementUtils
+
+
+def vim(vim_id, free_ram_mb, vcpus_used=0, version=None, **kwargs):
+    """
+    Returns a VIM document with 1000 MB RAM, 10 vCPUs and 100 GB disk
+    """
+    doc = {
+        "id": vim_id,
+        "resources": {
+            "memory_mb": 1000,
+            "free_ram_mb": free_ram_mb,
+            "vcpus": 10,
+            "vcpus_used": vcpus_used,
+            "local_gb": 100,
+            "local_gb_used": 0,
+        },
+        "reservation_version": version,
+    }
+    doc.update(kwargs)
+    return doc
+
+
+FLAVOR = {"memory-mb": 400, "vcpu-count": 1, "storage-gb": 10, "instances": 1}
+DEMAND = placementUtils.flavor_vector(FLAVOR)
+
+
+def test_capacity_vector_applies_the_allocation_ratios():
+    total, free = placementUtils.capacity_vector(vim("a", free_ram_mb=600, vcpus_used=4))
+    ram_ratio = placementUtils.RAM_ALLOCATION_RATIO
+    cpu_ratio = placementUtils.CPU_ALLOCATION_RATIO
+    assert total[:2] == [1000 * ram_ratio, 10 * cpu_ratio]
+    assert free[:2] == [1000 * ram_ratio - 400, 10 * cpu_ratio - 4]
+    assert free[3] == placementUtils.UNLIMITED
+
+
+def test_capacity_vector_without_resources():
+    assert placementUtils.capacity_vector({"id": "a"}) == (None, None)
+
+
+def test_choose_vim_strategies():
+    vims = [vim("a", free_ram_mb=900), vim("b", free_ram_mb=200)]
+    spread = placementUtils.choose_vim(vims, DEMAND, [], "spread")
+    binpack = placementUtils.choose_vim(vims, DEMAND, [], "binpack")
+    assert spread["id"] == "a"
+    assert binpack["id"] == "b"
+
+
+def test_choose_vim_ties_are_sorted_by_id():
+    vims = [vim("b", free_ram_mb=900), vim("a", free_ram_mb=900)]
+    assert placementUtils.choose_vim(vims, DEMAND, [], "spread")["id"] == "a"
+    assert placementUtils.choose_vim(vims, DEMAND, [], "binpack")["id"] == "a"
+
+
+def test_choose_vim_counts_the_reservations():
+    vims = [vim("a", free_ram_mb=900), vim("b", free_ram_mb=800)]
+    reservations = [{"vims": {"a": {"memory-mb": 500}}, "done_at": None}]
+    assert placementUtils.choose_vim(vims, DEMAND, reservations, "spread")["id"] == "b"
+
+
+def test_choose_vim_ignores_reservations_counted_by_a_refresh():
+    vims = [vim("a", free_ram_mb=900, resources_updated_at=200), vim("b", free_ram_mb=800)]
+    reservations = [{"vims": {"a": {"memory-mb": 500}}, "done_at": 100}]
+    assert placementUtils.choose_vim(vims, DEMAND, reservations, "spread")["id"] == "a"
+
+
+def test_choose_vim_without_enough_resources():
+    # 1000 MB * 1.5 - 1000 MB used = 500 MB left, and 600 MB are reserved
+    vims = [vim("a", free_ram_mb=0)]
+    reservations = [{"vims": {"a": {"memory-mb": 600}}, "done_at": None}]
+    assert placementUtils.choose_vim(vims, DEMAND, reservations, "spread") is None
+
+
+def test_choose_vim_uses_vims_without_resources_last():
+    vims = [{"id": "unknown"}, vim("a", free_ram_mb=900)]
+    assert placementUtils.choose_vim(vims, DEMAND, [], "spread")["id"] == "a"
+    assert placementUtils.choose_vim([{"id": "unknown"}], DEMAND, [], "spread")["id"] == "unknown"
+
+
+def test_select_vim_reserves_the_flavor(mongo):
+    mongo.find_all.return_value = []
+    mongo.find_and_update.return_value = {"id": "a"}
+    selected = placementUtils.select_vim([vim("a", free_ram_mb=900, version=3)], FLAVOR, "s1")
+    assert selected == "a"
+    mongo.bulk_upsert.assert_called_once()
+    ((data, update),) = mongo.bulk_upsert.call_args[0][1]
+    assert data == {"_id": "s1"}
+    assert update["$inc"] == {
+        "vims.a.memory-mb": 400,
+        "vims.a.vcpu-count": 1,
+        "vims.a.storage-gb": 10,
+        "vims.a.instances": 1,
+    }
+    version_data = mongo.find_and_update.call_args[0][1]
+    assert version_data == {"id": "a", "reservation_version": 3}
+
+
+def test_select_vim_reverts_the_reservation_of_a_changed_vim(mongo):
+    mongo.find_all.side_effect = lambda collection, data: (
+        [vim("a", free_ram_mb=900, version=4)] if collection == "vim" else []
+    )
+    mongo.find_and_update.return_value = None
+    selected = placementUtils.select_vim([vim("a", free_ram_mb=900, version=3)], FLAVOR, "s1")
+    assert selected is None
+    assert mongo.find_and_update.call_count == placementUtils.PLACEMENT_ATTEMPTS
+    increments = [call[0][1][0][1]["$inc"] for call in mongo.bulk_upsert.call_args_list]
+    assert len(increments) == 2 * placementUtils.PLACEMENT_ATTEMPTS
+    # Every reservation is followed by its revert
+    for reserved, reverted in zip(increments[::2], increments[1::2]):
+        assert reverted == {key: -value for key, value in reserved.items()}
+    # The VIMs are read again after a conflict
+    versions = [call[0][1]["reservation_version"] for call in mongo.find_and_update.call_args_list]
+    assert versions == [3, 4, 4]
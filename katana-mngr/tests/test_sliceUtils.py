@@ -0,0 +1,71 @@
+import pytest
+
+# The NFVO client of the slice workflows needs requests
+pytest.importorskip("requests")
+
+from katana.utils.sliceUtils import sliceUtils  # noqa: E402
+
+
+def test_diff_fields_nested():
+    old = {"status": "init", "deployment_time": {"Placement_Time": None, "WAN": "1.0"}}
+    new = {"status": "Placement", "deployment_time": {"Placement_Time": "0.5", "WAN": "1.0"}}
+    set_fields, unset_fields = sliceUtils.diff_fields(old, new)
+    assert set_fields == {"status": "Placement", "deployment_time.Placement_Time": "0.5"}
+    assert unset_fields == []
+
+
+def test_diff_fields_new_and_removed_keys():
+    old = {"a": 1, "b": {"c": 1, "d": 2}}
+    new = {"b": {"c": 1}, "e": [1, 2]}
+    set_fields, unset_fields = sliceUtils.diff_fields(old, new)
+    assert set_fields == {"e": [1, 2]}
+    assert sorted(unset_fields) == ["a", "b.d"]
+
+
+def test_diff_fields_lists_are_replaced():
+    set_fields, unset_fields = sliceUtils.diff_fields({"nf": [1, 2]}, {"nf": [1, 2, 3]})
+    assert set_fields == {"nf": [1, 2, 3]}
+    assert unset_fields == []
+
+
+def test_diff_fields_keys_not_usable_in_paths():
+    # The keys with dots cannot be used in dot notation - The whole sub-document is set
+    old = {"vim_list": {"vim.1": {"ns_list": []}}}
+    new = {"vim_list": {"vim.1": {"ns_list": ["ns"]}}}
+    set_fields, unset_fields = sliceUtils.diff_fields(old, new)
+    assert set_fields == {"vim_list": new["vim_list"]}
+    assert unset_fields == []
+
+
+def test_diff_fields_new_sub_document():
+    set_fields, unset_fields = sliceUtils.diff_fields({"ems_data": {}}, {"ems_data": {"e": 1}})
+    assert set_fields == {"ems_data.e": 1}
+    assert unset_fields == []
+
+
+def test_state_writer_sends_only_the_changes(mongo):
+    stored = {"_id": "slice", "status": "init", "conf_comp": {"nf": [], "ems": []}}
+    nest = {"_id": "slice", "status": "init", "conf_comp": {"nf": [], "ems": []}}
+    state = sliceUtils.SliceStateWriter(nest, stored)
+
+    state.write()
+    mongo.update_fields.assert_not_called()
+
+    nest["status"] = "Placement"
+    nest["conf_comp"]["nf"].append("nsd")
+    state.write()
+    mongo.update_fields.assert_called_once_with(
+        "slice", "slice", {"status": "Placement", "conf_comp.nf": ["nsd"]}, unset_data=[]
+    )
+
+    # The written changes are not sent again
+    mongo.update_fields.reset_mock()
+    state.write()
+    mongo.update_fields.assert_not_called()
+
+
+def test_state_writer_unsets_removed_fields(mongo):
+    stored = {"_id": "slice", "ns_list": [], "checkpoint": "Placement"}
+    nest = {"_id": "slice", "ns_list": []}
+    sliceUtils.SliceStateWriter(nest, stored).write()
+    mongo.update_fields.assert_called_once_with("slice", "slice", {}, unset_data=["checkpoint"])
@@ -0,0 +1,56 @@
+import threading
+
+from katana.utils.workerUtils import workerUtils
+
+
+def test_actions_of_a_slice_run_in_order():
+    pool = workerUtils.SliceWorkerPool(max_workers=4)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def first():
+        started.set()
+        release.wait(5)
+        order.append("add")
+
+    pool.submit("slice", first)
+    started.wait(5)
+    # The slice is busy - The actions are queued behind the running one
+    pool.submit("slice", order.append, "delete")
+    pool.submit("slice", order.append, "add again")
+    assert pool.active() == ["slice"]
+    release.set()
+    pool.shutdown()
+    assert order == ["add", "delete", "add again"]
+    assert pool.busy() == 0
+
+
+def test_slices_run_in_parallel():
+    pool = workerUtils.SliceWorkerPool(max_workers=2)
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    def action(slice_id):
+        # Both actions must be running at the same time to pass the barrier
+        barrier.wait()
+        results.append(slice_id)
+
+    pool.submit("a", action, "a")
+    pool.submit("b", action, "b")
+    pool.shutdown()
+    assert sorted(results) == ["a", "b"]
+
+
+def test_failed_action_does_not_block_the_slice():
+    pool = workerUtils.SliceWorkerPool(max_workers=1)
+    done = []
+
+    def fail():
+        raise RuntimeError("failed")
+
+    pool.submit("slice", fail)
+    pool.submit("slice", done.append, "next")
+    pool.shutdown()
+    assert done == ["next"]
+    assert pool.busy() == 0
@@ -6,13 +6,15 @@ import time
 import uuid
 
 from bson.binary import Binary
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 import pymongo
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.emsUtils import amar_emsUtils, test_emsUtils
 from katana.shared_utils.mongoUtils import mongoUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -35,35 +37,34 @@ class EmsView(FlaskView):
         """
         Returns a list of EMS and their details,
         used by: `katana ems ls`
+        Accepts the limit and after query parameters
         """
-        ems_data = mongoUtils.index("ems")
-        return_data = []
-        for iems in ems_data:
-            return_data.append(
-                dict(
-                    _id=iems["_id"],
-                    ems_id=iems["id"],
-                    ems_type=iems["type"],
-                    created_at=iems["created_at"],
-                )
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "ems",
+            ["id", "type", "created_at"],
+            lambda iems: dict(
+                _id=iems["_id"],
+                ems_id=iems["id"],
+                ems_type=iems["type"],
+                created_at=iems["created_at"],
+            ),
+        )
 
     # @route('/all/') #/ems/all
     def all(self):
         """
         Same with index(self) above, but returns all EMS details
         """
-        return dumps(mongoUtils.index("ems")), 200
+        return jsonUtils.raw_stream(mongoUtils.index("ems", raw=True))
 
     def get(self, uuid):
         """
         Returns the details of specific EMS,
         used by: `katana ems inspect [uuid]`
         """
-        data = mongoUtils.get("ems", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("ems", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -101,9 +102,11 @@ class EmsView(FlaskView):
         Delete a specific EMS.
         used by: `katana ems rm [uuid]`
         """
+        ems = mongoUtils.get("ems", uuid)
         mongoUtils.delete("ems_obj", uuid)
         result = mongoUtils.delete("ems", uuid)
         if result:
+            adapterUtils.signal_change("ems", ems["id"])
             return "Deleted EMS {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -128,6 +131,7 @@ class EmsView(FlaskView):
                 return f"Error: Required fields: {self.req_fields}", 400
             else:
                 mongoUtils.update("ems", uuid, data)
+                adapterUtils.signal_change("ems", data["id"])
             return f"Modified {uuid}", 200
         else:
             new_uuid = uuid
@@ -4,12 +4,14 @@ from logging import handlers
 import time
 import uuid
 
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 import pymongo
 
 from katana.shared_utils.mongoUtils import mongoUtils
+from katana.slice_mapping import slice_mapping
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -32,29 +34,29 @@ class FunctionView(FlaskView):
         """
         Returns a list of supported functions and their details,
         used by: `katana function ls`
+        Accepts the limit, after and location query parameters
         """
-        data = mongoUtils.index("func")
-        return_data = []
-        for iserv in data:
-            return_data.append(
-                dict(
-                    _id=iserv["_id"],
-                    gen=(lambda x: "4G" if x == 4 else "5G")(iserv["gen"]),
-                    func=(lambda x: "Core" if x == 0 else "Radio")(iserv["func"]),
-                    type=(lambda x: "Virtual" if x == 0 else "Physical")(iserv["type"]),
-                    func_id=iserv["id"],
-                    loc=iserv["location"],
-                    created_at=iserv["created_at"],
-                )
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "func",
+            ["gen", "func", "type", "id", "location", "created_at"],
+            lambda iserv: dict(
+                _id=iserv["_id"],
+                gen=(lambda x: "4G" if x == 4 else "5G")(iserv["gen"]),
+                func=(lambda x: "Core" if x == 0 else "Radio")(iserv["func"]),
+                type=(lambda x: "Virtual" if x == 0 else "Physical")(iserv["type"]),
+                func_id=iserv["id"],
+                loc=iserv["location"],
+                created_at=iserv["created_at"],
+            ),
+            filters=("location",),
+        )
 
     def get(self, uuid):
         """
         Returns the details of specific function,
         used by: `katana function inspect [uuid]`
         """
-        return dumps(mongoUtils.get("func", uuid)), 200
+        return jsonUtils.raw_response(mongoUtils.get("func", uuid, raw=True))
 
     def post(self):
         """
@@ -77,6 +79,7 @@ class FunctionView(FlaskView):
             new_uuid = mongoUtils.add("func", data)
         except pymongo.errors.DuplicateKeyError:
             return f"Network Function with id {data['id']} already exists", 400
+        slice_mapping.catalog_changed()
         return f"Created {new_uuid}", 201
 
     def delete(self, uuid):
@@ -89,6 +92,7 @@ class FunctionView(FlaskView):
             if len(result["tenants"]) > 0:
                 return f"Error: Function is used by slices {result['tenants']}"
             mongoUtils.delete("func", uuid)
+            slice_mapping.catalog_changed()
             return "Deleted Network Function {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -110,6 +114,7 @@ class FunctionView(FlaskView):
             if len(data["tenants"]) > 0:
                 return f"Error: Func is used by slices {data['tenants']}"
             mongoUtils.update("func", uuid, data)
+            slice_mapping.catalog_changed()
             return f"Modified {uuid}", 200
         else:
             new_uuid = uuid
@@ -127,4 +132,5 @@ class FunctionView(FlaskView):
                 new_uuid = mongoUtils.add("func", data)
             except pymongo.errors.DuplicateKeyError:
                 return f"Function with id {data['id']} already exists", 400
+            slice_mapping.catalog_changed()
             return f"Created {new_uuid}", 201
@@ -2,10 +2,11 @@
 import logging
 from logging import handlers
 
-from bson.json_util import dumps
 from flask_classful import FlaskView
 
 from katana.shared_utils.mongoUtils import mongoUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -27,20 +28,19 @@ class GstView(FlaskView):
         """
         Returns a list of GST and their details,
         used by: `katana gst ls`
+        Accepts the limit and after query parameters
         """
-        gst_data = mongoUtils.index("gst")
-        return_data = []
-        for gst in gst_data:
-            return_data.append(dict(_id=gst["_id"]))
-        return dumps(return_data), 200
+        return pageUtils.list_response("gst", ["_id"], lambda gst: dict(_id=gst["_id"]))
 
     def get(self, uuid):
         """
-        Returns the details of specific GST,
+        Returns the details of specific GST, by its id or by the id of a slice that uses it,
         used by: `katana gst inspect [uuid]`
         """
-        data = mongoUtils.get("gst", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("gst", uuid, raw=True)
+        if data is None:
+            data = mongoUtils.find("gst", {"slices": uuid}, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
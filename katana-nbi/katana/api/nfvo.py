@@ -6,14 +6,16 @@ import time
 import uuid
 
 from bson.binary import Binary
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 import pymongo
 from requests import ConnectTimeout, ConnectionError
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.nfvoUtils import osmUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -36,35 +38,34 @@ class NFVOView(FlaskView):
         """
         Returns a list of nfvo and their details,
         used by: `katana nfvo ls`
+        Accepts the limit and after query parameters
         """
-        nfvo_data = mongoUtils.index("nfvo")
-        return_data = []
-        for infvo in nfvo_data:
-            return_data.append(
-                dict(
-                    _id=infvo["_id"],
-                    nfvo_id=infvo["id"],
-                    created_at=infvo["created_at"],
-                    type=infvo["type"],
-                )
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "nfvo",
+            ["id", "created_at", "type"],
+            lambda infvo: dict(
+                _id=infvo["_id"],
+                nfvo_id=infvo["id"],
+                created_at=infvo["created_at"],
+                type=infvo["type"],
+            ),
+        )
 
     # @route('/all/') #/nfvo/all
     def all(self):
         """
         Same with index(self) above, but returns all nfvo details
         """
-        return dumps(mongoUtils.index("nfvo")), 200
+        return jsonUtils.raw_stream(mongoUtils.index("nfvo", raw=True))
 
     def get(self, uuid):
         """
         Returns the details of specific nfvo,
         used by: `katana nfvo inspect [uuid]`
         """
-        data = mongoUtils.get("nfvo", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("nfvo", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -94,11 +95,11 @@ class NFVOView(FlaskView):
                 osm.getToken()
             except ConnectTimeout as e:
                 logger.exception("Connection Timeout: {}".format(e))
-                response = dumps({"error": "Unable to connect to NFVO"})
+                response = jsonUtils.dumps({"error": "Unable to connect to NFVO"})
                 return (response, 400)
             except ConnectionError as e:
                 logger.exception("Connection Error: {}".format(e))
-                response = dumps({"error": "Unable to connect to NFVO"})
+                response = jsonUtils.dumps({"error": "Unable to connect to NFVO"})
                 return (response, 400)
             else:
                 # Store the osm object to the mongo db
@@ -113,7 +114,7 @@ class NFVOView(FlaskView):
                 osm.bootstrapNfvo()
                 return f"Created {new_uuid}", 201
         else:
-            response = dumps({"error": "This type nfvo is not supported"})
+            response = jsonUtils.dumps({"error": "This type nfvo is not supported"})
             return response, 400
 
     def delete(self, uuid):
@@ -129,6 +130,7 @@ class NFVOView(FlaskView):
             mongoUtils.delete_all("nsd", {"nfvo_id": del_nfvo["id"]})
             mongoUtils.delete_all("vnfd", {"nfvoid": del_nfvo["id"]})
             mongoUtils.delete("nfvo", uuid)
+            adapterUtils.signal_change("nfvo", del_nfvo["id"])
             return "Deleted NFVO {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -154,6 +156,7 @@ class NFVOView(FlaskView):
                 return f"Error: Required fields: {self.req_fields}", 400
             else:
                 mongoUtils.update("nfvo", uuid, data)
+                adapterUtils.signal_change("nfvo", data["id"])
             return f"Modified {uuid}", 200
         else:
             new_uuid = uuid
@@ -180,11 +183,11 @@ class NFVOView(FlaskView):
                     osm.getToken()
                 except ConnectTimeout as e:
                     logger.exception("Connection Timeout: {}".format(e))
-                    response = dumps({"error": "Unable to connect to NFVO"})
+                    response = jsonUtils.dumps({"error": "Unable to connect to NFVO"})
                     return (response, 400)
                 except ConnectionError as e:
                     logger.exception("Connection Error: {}".format(e))
-                    response = dumps({"error": "Unable to connect to NFVO"})
+                    response = jsonUtils.dumps({"error": "Unable to connect to NFVO"})
                     return (response, 400)
                 else:
                     # Store the osm object to the mongo db
@@ -198,6 +201,6 @@ class NFVOView(FlaskView):
                     # Get information regarding VNFDs and NSDs
                     osm.bootstrapNfvo()
             else:
-                response = dumps({"error": "This type nfvo is not supported"})
+                response = jsonUtils.dumps({"error": "This type nfvo is not supported"})
                 return response, 400
             return f"Created {new_uuid}", 201
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 import logging
 from logging import handlers
-import pickle
+import os
 
-from bson.json_util import dumps
-from flask_classful import FlaskView
+from flask_classful import FlaskView, route
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.nfvoUtils import osmUtils
+from katana.utils.jsonUtils import jsonUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -21,6 +22,20 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
+# Seconds that the stored NSDs/VNFDs are used before the NFVOs are read again
+CATALOG_TTL = int(os.getenv("KATANA_CATALOG_TTL", 300))
+
+
+def bootstrap_nfvo(max_age=None):
+    """
+    Reads the NSDs/VNFDs of every registered NFVO
+    """
+    adapterUtils.sync()
+    for infvo in list(mongoUtils.find_all("nfvo")):
+        nfvo = adapterUtils.get("nfvo", infvo["id"])
+        if nfvo:
+            nfvo.bootstrapNfvo(max_age=max_age)
+
 
 class NslistView(FlaskView):
     route_prefix = "/api/"
@@ -30,13 +45,19 @@ class NslistView(FlaskView):
         Returns a list with all the onboarded nsds,
         used by: `katana ns ls`
         """
-
-        # Bootstrap the NFVO
-        nfvo_obj_list = list(mongoUtils.find_all("nfvo_obj"))
-        for infvo in nfvo_obj_list:
-            nfvo = pickle.loads(infvo["obj"])
-            nfvo.bootstrapNfvo()
+        # Read the NFVOs only if the stored NSDs are older than CATALOG_TTL
+        bootstrap_nfvo(max_age=CATALOG_TTL)
 
         # Return the list
         ns_list = mongoUtils.find_all("nsd")
-        return dumps(ns_list), 200
+        return jsonUtils.stream(ns_list)
+
+    @route("/refresh", methods=["GET", "POST"])
+    def refresh(self):
+        """
+        Reads again the nsds from the NFVOs and returns the list,
+        used by: `katana ns ls --refresh`
+        """
+        bootstrap_nfvo()
+        ns_list = mongoUtils.find_all("nsd")
+        return jsonUtils.stream(ns_list)
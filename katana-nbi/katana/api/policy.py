@@ -5,13 +5,15 @@ import time
 import uuid
 
 from bson.binary import Binary
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView, route
 import pymongo
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.policyUtils import neatUtils, test_policyUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -34,28 +36,27 @@ class PolicyView(FlaskView):
         """
         Returns a list of policy management system and their details,
         used by: `katana policy ls`
+        Accepts the limit and after query parameters
         """
-        policy_data = mongoUtils.index("policy")
-        return_data = []
-        for item in policy_data:
-            return_data.append(
-                dict(
-                    _id=item["_id"],
-                    component_id=item["id"],
-                    created_at=item["created_at"],
-                    type=item["type"],
-                )
-            )
-        return dumps(return_data)
+        return pageUtils.list_response(
+            "policy",
+            ["id", "created_at", "type"],
+            lambda item: dict(
+                _id=item["_id"],
+                component_id=item["id"],
+                created_at=item["created_at"],
+                type=item["type"],
+            ),
+        )
 
     def get(self, uuid):
         """
         Returns the details of specific policy management system,
         used by: `katana policy inspect [uuid]`
         """
-        data = mongoUtils.get("policy", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("policy", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -95,8 +96,10 @@ class PolicyView(FlaskView):
         Delete a specific policy management system.
         used by: `katana policy rm [uuid]`
         """
+        policy = mongoUtils.get("policy", uuid)
         del_policy = mongoUtils.delete("policy", uuid)
         if del_policy:
+            adapterUtils.signal_change("policy", policy["id"])
             return "Deleted policy management system {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -121,6 +124,7 @@ class PolicyView(FlaskView):
                 return f"Error: Required fields: {self.req_fields}", 400
             else:
                 mongoUtils.update("policy", uuid, data)
+                adapterUtils.signal_change("policy", data["id"])
             return f"Modified {uuid}", 200
         else:
             # Create the object and store it in the object collection
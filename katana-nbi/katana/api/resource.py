@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 import logging
 from logging import handlers
-import pickle
-from threading import Thread
+import time
 
-from bson.json_util import dumps
+from flask import request
 from flask_classful import FlaskView, route
 
 from katana.shared_utils.mongoUtils import mongoUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.resourceUtils import resourceUtils
+from katana.utils.timeseriesUtils import timeseriesUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -36,6 +38,7 @@ def get_vims(filter_data=None):
                 "type": vim["type"],
                 "tenants": vim["tenants"],
                 "resources": vim["resources"],
+                "resources_updated_at": vim.get("resources_updated_at"),
             }
         )
     return vims
@@ -65,18 +68,15 @@ def get_func(filter_data={}):
     return functions
 
 
-def vim_update():
+def max_age():
     """
-    Gets the resources of the stored VIMs
+    Returns the max age (in seconds) of the VIM resources that is requested by the
+    max_age query parameter, or None
     """
-    for vim in mongoUtils.find_all("vim"):
-        if vim["type"] == "openstack":
-            vim_obj = pickle.loads(mongoUtils.get("vim_obj", vim["_id"])["obj"])
-            resources = vim_obj.get_resources()
-            vim["resources"] = resources
-            mongoUtils.update("vim", vim["_id"], vim)
-        else:
-            resources = "N/A"
+    try:
+        return float(request.args["max_age"])
+    except (KeyError, ValueError):
+        return None
 
 
 class ResourcesView(FlaskView):
@@ -87,12 +87,15 @@ class ResourcesView(FlaskView):
         Returns the available resources on platform,
         used by: `katana resource ls`
         """
+        # Refresh the resources that are older than max_age
+        if max_age() is not None:
+            resourceUtils.ensure_fresh(max_age())
         # Get VIMs
         vims = get_vims()
         # Get Functions
         functions = get_func()
         resources = {"VIMs": vims, "Functions": functions}
-        return dumps(resources), 200
+        return jsonUtils.response(resources)
 
     def get(self, uuid):
         """
@@ -101,17 +104,39 @@ class ResourcesView(FlaskView):
         """
         # Get VIMs
         filter_data = {"location": uuid}
+        # Refresh the resources that are older than max_age
+        if max_age() is not None:
+            resourceUtils.ensure_fresh(max_age(), filter_data)
         vims = get_vims(filter_data)
         # Get Functions
         functions = get_func(filter_data)
         resources = {"VIMs": vims, "Functions": functions}
-        return dumps(resources), 200
+        return jsonUtils.response(resources)
+
+    @route("/history/<vim_id>", methods=["GET"])
+    def history(self, vim_id):
+        """
+        Returns the history of the resources of a VIM, aggregated per window,
+        used by: `katana resource history <vim_id>`
+        """
+        if not mongoUtils.find("vim", {"id": vim_id}):
+            return "Error: No such vim: {}".format(vim_id), 404
+        resolution = request.args.get("resolution", "1m")
+        if resolution not in timeseriesUtils.RESOLUTIONS:
+            return f"Error: resolution must be one of {list(timeseriesUtils.RESOLUTIONS)}", 400
+        try:
+            until = float(request.args.get("until", time.time()))
+            since = float(request.args.get("since", until - 3600))
+            window = float(request.args["window"]) if "window" in request.args else None
+        except ValueError:
+            return "Error: since, until and window must be numbers", 400
+        data = timeseriesUtils.history(vim_id, resolution, since, until, window)
+        return jsonUtils.response(data)
 
     @route("/update", methods=["GET", "POST"])
     def update(self):
         """
         Update the resource database for the stored VIMs
         """
-        thread = Thread(target=vim_update)
-        thread.start()
+        resourceUtils.refresh_all()
         return "Updating resource database", 200
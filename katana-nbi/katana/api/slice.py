@@ -2,14 +2,16 @@ import logging
 from logging import handlers
 import uuid
 
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView, route
+from kafka.errors import KafkaError
 import urllib3
 
 from katana.shared_utils.kafkaUtils import kafkaUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.slice_mapping import slice_mapping
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -37,23 +39,25 @@ class SliceView(FlaskView):
         """
         Returns a list of slices and their details,
         used by: `katana slice ls`
+        Accepts the limit, after and status query parameters
         """
-        slice_data = mongoUtils.index("slice")
-        return_data = []
-        for islice in slice_data:
-            return_data.append(
-                dict(_id=islice["_id"], created_at=islice["created_at"], status=islice["status"])
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "slice",
+            ["created_at", "status"],
+            lambda islice: dict(
+                _id=islice["_id"], created_at=islice["created_at"], status=islice["status"]
+            ),
+            filters=("status",),
+        )
 
     def get(self, uuid):
         """
         Returns the details of specific slice,
         used by: `katana slice inspect [uuid]`
         """
-        data = mongoUtils.get("slice", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("slice", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -64,7 +68,7 @@ class SliceView(FlaskView):
         """
         islice = mongoUtils.get("slice", uuid)
         if islice:
-            return dumps(islice["deployment_time"]), 200
+            return jsonUtils.response(islice["deployment_time"])
         else:
             return "Not Found", 404
 
@@ -83,9 +87,14 @@ class SliceView(FlaskView):
             return nest, error_code
 
         # Send the message to katana-mngr
-        producer = kafkaUtils.create_producer()
         slice_message = {"action": "add", "message": nest}
-        producer.send("slice", value=slice_message)
+        try:
+            kafkaUtils.send_message("slice", slice_message, key=new_uuid)
+        except KafkaError as e:
+            logger.exception(f"Slice {new_uuid} was not sent to katana-mngr: {e}")
+            # Release the functions and the GST that were claimed by the mapping
+            slice_mapping.release_slice(nest)
+            return "Error: Slice Manager is not available", 503
 
         return new_uuid, 201
 
@@ -102,9 +111,12 @@ class SliceView(FlaskView):
             return "Error: No such slice: {}".format(uuid), 404
         else:
             # Send the message to katana-mngr
-            producer = kafkaUtils.create_producer()
             slice_message = {"action": "delete", "message": delete_json}
-            producer.send("slice", value=slice_message)
+            try:
+                kafkaUtils.send_message("slice", slice_message, key=uuid)
+            except KafkaError as e:
+                logger.exception(f"Slice {uuid} deletion was not sent to katana-mngr: {e}")
+                return "Error: Slice Manager is not available", 503
             return "Deleting {0}".format(uuid), 200
 
     # def put(self, uuid):
@@ -3,11 +3,13 @@ import logging
 from logging import handlers
 import uuid
 
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 
 from katana.shared_utils.mongoUtils import mongoUtils
+from katana.slice_mapping import slice_mapping
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -29,14 +31,15 @@ class Slice_desView(FlaskView):
         """
         Returns a list of Slice Descriptors and their details,
         used by: `katana slice_des ls`
+        Accepts the limit and after query parameters
         """
-        slice_des_data = mongoUtils.index("base_slice_des_ref")
-        return_data = []
-        for islicedes in slice_des_data:
-            return_data.append(
-                dict(_id=islicedes["_id"], base_slice_des_id=islicedes["base_slice_des_id"])
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "base_slice_des_ref",
+            ["base_slice_des_id"],
+            lambda islicedes: dict(
+                _id=islicedes["_id"], base_slice_des_id=islicedes["base_slice_des_id"]
+            ),
+        )
 
     def post(self):
         """
@@ -46,16 +49,18 @@ class Slice_desView(FlaskView):
         new_uuid = str(uuid.uuid4())
         data = request.json
         data["_id"] = new_uuid
-        return str(mongoUtils.add("base_slice_des_id", data)), 201
+        new_uuid = mongoUtils.add("base_slice_des_id", data)
+        slice_mapping.catalog_changed()
+        return str(new_uuid), 201
 
     def get(self, uuid):
         """
         Returns the details of specific Slice Descriptor,
         used by: `katana slice_des inspect [uuid]`
         """
-        data = mongoUtils.get("base_slice_des_ref", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("base_slice_des_ref", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -71,12 +76,15 @@ class Slice_desView(FlaskView):
 
         if old_data:
             mongoUtils.update("base_slice_des_ref", uuid, data)
+            slice_mapping.catalog_changed()
             return f"Modified {uuid}", 200
         else:
             new_uuid = uuid
             data = request.json
             data["_id"] = new_uuid
-            return "Created " + str(mongoUtils.add("base_slice_des_ref", data)), 201
+            new_uuid = mongoUtils.add("base_slice_des_ref", data)
+            slice_mapping.catalog_changed()
+            return "Created " + str(new_uuid), 201
 
     def delete(self, uuid):
         """
@@ -85,6 +93,7 @@ class Slice_desView(FlaskView):
         """
         result = mongoUtils.delete("base_slice_des_ref", uuid)
         if result:
+            slice_mapping.catalog_changed()
             return "Deleted Slice Descriptor {}".format(uuid), 200
         else:
             # if uuid is not found, return error
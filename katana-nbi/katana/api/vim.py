@@ -6,14 +6,16 @@ import time
 import uuid
 
 from bson.binary import Binary
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 import pymongo
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.vimUtils import opennebulaUtils
 from katana.shared_utils.vimUtils import openstackUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -36,35 +38,34 @@ class VimView(FlaskView):
         """
         Returns a list of vims and their details,
         used by: `katana vim ls`
+        Accepts the limit and after query parameters
         """
-        vim_data = mongoUtils.index("vim")
-        return_data = []
-        for ivim in vim_data:
-            return_data.append(
-                dict(
-                    _id=ivim["_id"],
-                    vim_id=ivim["id"],
-                    created_at=ivim["created_at"],
-                    type=ivim["type"],
-                )
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "vim",
+            ["id", "created_at", "type"],
+            lambda ivim: dict(
+                _id=ivim["_id"],
+                vim_id=ivim["id"],
+                created_at=ivim["created_at"],
+                type=ivim["type"],
+            ),
+        )
 
     # @route('/all/') #/vim/all
     def all(self):
         """
         Same with index(self) above, but returns all vim details
         """
-        return dumps(mongoUtils.index("vim")), 200
+        return jsonUtils.raw_stream(mongoUtils.index("vim", raw=True))
 
     def get(self, uuid):
         """
         Returns the details of specific vim,
         used by: `katana vim inspect [uuid]`
         """
-        data = mongoUtils.get("vim", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("vim", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -98,10 +99,11 @@ class VimView(FlaskView):
                 if new_vim.auth_error:
                     raise (AttributeError)
             except AttributeError as e:
-                response = dumps({"error": e})
+                response = jsonUtils.dumps({"error": e})
                 return response, 400
             else:
                 request.json["resources"] = new_vim.get_resources()
+                request.json["resources_updated_at"] = time.time()
                 thebytes = pickle.dumps(new_vim)
                 obj_json = {"_id": new_uuid, "id": request.json["id"], "obj": Binary(thebytes)}
         elif request.json["type"] == "opennebula":
@@ -114,14 +116,14 @@ class VimView(FlaskView):
                     password=password,
                 )
             except AttributeError as e:
-                response = dumps({"Error": e})
+                response = jsonUtils.dumps({"Error": e})
                 return response, 400
             else:
                 request.json["resources"] = {"N/A": "N/A"}
                 thebytes = pickle.dumps(new_vim)
                 obj_json = {"_id": new_uuid, "id": request.json["id"], "obj": Binary(thebytes)}
         else:
-            response = dumps({"error": "This type VIM is not supported"})
+            response = jsonUtils.dumps({"error": "This type VIM is not supported"})
             return response, 400
         try:
             new_uuid = mongoUtils.add("vim", request.json)
@@ -141,6 +143,7 @@ class VimView(FlaskView):
                 return "Cannot delete vim {} - In use".format(uuid), 400
             mongoUtils.delete("vim_obj", uuid)
             mongoUtils.delete("vim", uuid)
+            adapterUtils.signal_change("vim", vim["id"])
             return "Deleted VIM {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -167,6 +170,7 @@ class VimView(FlaskView):
                 return f"Error: Required fields: {self.req_fields}", 400
             else:
                 mongoUtils.update("vim", uuid, data)
+                adapterUtils.signal_change("vim", data["id"])
             return f"Modified {uuid}", 200
         else:
             request.json["_id"] = new_uuid
@@ -193,10 +197,11 @@ class VimView(FlaskView):
                     if new_vim.auth_error:
                         raise (AttributeError)
                 except AttributeError as e:
-                    response = dumps({"error": e})
+                    response = jsonUtils.dumps({"error": e})
                     return response, 400
                 else:
                     request.json["resources"] = new_vim.get_resources()
+                    request.json["resources_updated_at"] = time.time()
                     thebytes = pickle.dumps(new_vim)
                     obj_json = {"_id": new_uuid, "id": request.json["id"], "obj": Binary(thebytes)}
             elif request.json["type"] == "opennebula":
@@ -209,14 +214,14 @@ class VimView(FlaskView):
                         password=password,
                     )
                 except AttributeError as e:
-                    response = dumps({"Error": e})
+                    response = jsonUtils.dumps({"Error": e})
                     return response, 400
                 else:
                     request.json["resources"] = {"N/A": "N/A"}
                     thebytes = pickle.dumps(new_vim)
                     obj_json = {"_id": new_uuid, "id": request.json["id"], "obj": Binary(thebytes)}
             else:
-                response = dumps({"error": "This type VIM is not supported"})
+                response = jsonUtils.dumps({"error": "This type VIM is not supported"})
                 return response, 400
             try:
                 new_uuid = mongoUtils.add("vim", request.json)
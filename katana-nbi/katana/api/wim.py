@@ -6,13 +6,15 @@ import time
 import uuid
 
 from bson.binary import Binary
-from bson.json_util import dumps
 from flask import request
 from flask_classful import FlaskView
 import pymongo
 
+from katana.shared_utils.adapterUtils import adapterUtils
 from katana.shared_utils.mongoUtils import mongoUtils
 from katana.shared_utils.wimUtils import odl_wimUtils, test_wimUtils
+from katana.utils.jsonUtils import jsonUtils
+from katana.utils.pageUtils import pageUtils
 
 # Logging Parameters
 logger = logging.getLogger(__name__)
@@ -35,35 +37,34 @@ class WimView(FlaskView):
         """
         Returns a list of wims and their details,
         used by: `katana wim ls`
+        Accepts the limit and after query parameters
         """
-        wim_data = mongoUtils.index("wim")
-        return_data = []
-        for iwim in wim_data:
-            return_data.append(
-                dict(
-                    _id=iwim["_id"],
-                    wim_id=iwim["id"],
-                    wim_type=iwim["type"],
-                    created_at=iwim["created_at"],
-                )
-            )
-        return dumps(return_data), 200
+        return pageUtils.list_response(
+            "wim",
+            ["id", "type", "created_at"],
+            lambda iwim: dict(
+                _id=iwim["_id"],
+                wim_id=iwim["id"],
+                wim_type=iwim["type"],
+                created_at=iwim["created_at"],
+            ),
+        )
 
     # @route('/all/') #/wim/all
     def all(self):
         """
         Same with index(self) above, but returns all wim details
         """
-        return dumps(mongoUtils.index("wim")), 200
+        return jsonUtils.raw_stream(mongoUtils.index("wim", raw=True))
 
     def get(self, uuid):
         """
         Returns the details of specific wim,
         used by: `katana wim inspect [uuid]`
         """
-        data = mongoUtils.get("wim", uuid)
-        if data:
-            return dumps(data), 200
+        data = mongoUtils.get("wim", uuid, raw=True)
+        if data is not None:
+            return jsonUtils.raw_response(data)
         else:
             return "Not Found", 404
 
@@ -108,6 +109,7 @@ class WimView(FlaskView):
                 return "Cannot delete wim {} - In use".format(uuid), 400
             mongoUtils.delete("wim_obj", uuid)
             mongoUtils.delete("wim", uuid)
+            adapterUtils.signal_change("wim", wim["id"])
             return "Deleted WIM {}".format(uuid), 200
         else:
             # if uuid is not found, return error
@@ -133,6 +135,7 @@ class WimView(FlaskView):
                 return f"Error: Required fields: {self.req_fields}", 400
             else:
                 mongoUtils.update("wim", uuid, data)
+                adapterUtils.signal_change("wim", data["id"])
             return f"Modified {uuid}", 200
         else:
             new_uuid = uuid
@@ -13,6 +13,7 @@ from katana.api.slice import SliceView
 from katana.api.slice_des import Slice_desView
 from katana.api.vim import VimView
 from katana.api.wim import WimView
+from katana.utils.resourceUtils import resourceUtils
 
 
 def create_app():
@@ -41,4 +42,7 @@ def create_app():
     PolicyView.register(app, trailing_slash=False)
     NslistView.register(app, trailing_slash=False)
 
+    # Refresh the VIM resources in the background
+    resourceUtils.start_monitor()
+
     return app
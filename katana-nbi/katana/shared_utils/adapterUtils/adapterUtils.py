@@ -0,0 +1,85 @@
+import logging
+from logging import handlers
+import pickle
+import threading
+import time
+
+from katana.shared_utils.mongoUtils import mongoUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+# Collection where the changes on the components are signaled to the other processes
+SIGNAL_COLLECTION = "adapter_signal"
+# Overlap (in seconds) between two syncs, to cover clock differences between containers
+SYNC_MARGIN = 5
+
+# NOTE: The registry is per process. Every process keeps its own copy of the adapters
+adapters = {}
+lock = threading.Lock()
+last_sync = 0
+
+
+def get(kind, component_id):
+    """
+    Returns the adapter object (vim, nfvo, wim, ems, policy) of the given component
+    The adapter is loaded from the db the first time and then it is served from memory
+    Returns None if the component is not registered
+    """
+    key = (kind, component_id)
+    try:
+        return adapters[key]
+    except KeyError:
+        pass
+    obj_json = mongoUtils.find(f"{kind}_obj", {"id": component_id})
+    if not obj_json:
+        return None
+    adapter = pickle.loads(obj_json["obj"])
+    with lock:
+        # If another thread has already loaded it, keep the first one
+        adapter = adapters.setdefault(key, adapter)
+    return adapter
+
+
+def invalidate(kind, component_id):
+    """
+    Removes the adapter of the given component from the registry of this process
+    """
+    with lock:
+        adapters.pop((kind, component_id), None)
+
+
+def signal_change(kind, component_id):
+    """
+    Signals that a component was updated or deleted
+    The adapter is removed from this process and from the other processes on their next sync
+    """
+    invalidate(kind, component_id)
+    mongoUtils.update_fields(
+        SIGNAL_COLLECTION,
+        f"{kind}:{component_id}",
+        {"kind": kind, "id": component_id, "changed_at": time.time()},
+        upsert=True,
+    )
+
+
+def sync():
+    """
+    Removes the adapters that were changed by other processes since the last sync
+    """
+    global last_sync
+
+    now = time.time()
+    changes = mongoUtils.find_all(SIGNAL_COLLECTION, {"changed_at": {"$gte": last_sync}})
+    for change in changes:
+        invalidate(change["kind"], change["id"])
+    last_sync = now - SYNC_MARGIN
@@ -1,9 +1,11 @@
 import logging
 import logging.handlers
+import threading
+import time
 import uuid
 
-import pymongo
 import requests
+from requests.adapters import HTTPAdapter
 
 from katana.shared_utils.mongoUtils import mongoUtils
 
@@ -19,6 +21,11 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
+# Seconds before the token expiration that a new token is requested
+TOKEN_EXPIRY_MARGIN = 60
+# Max number of connections kept open to each OSM
+POOL_MAXSIZE = 20
+
 
 class Osm:
     """
@@ -34,12 +41,70 @@ class Osm:
         self.password = password
         self.project_id = project_id
         self.token = ""
+        self.token_expires = 0
         self.timeout = timeout
         self.nfvo_id = nfvo_id
+        self._session = None
+        self._token_lock = threading.Lock()
+        self._catalog_validators = {}
+
+    def __getstate__(self):
+        """
+        The HTTP session and the lock cannot be pickled - Leave them out
+        """
+        state = self.__dict__.copy()
+        state.pop("_session", None)
+        state.pop("_token_lock", None)
+        state.pop("_catalog_validators", None)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the object and recreate the parameters that were not pickled
+        """
+        state.setdefault("token_expires", 0)
+        self.__dict__.update(state)
+        self._session = None
+        self._token_lock = threading.Lock()
+        self._catalog_validators = {}
 
-    def getToken(self):
+    @property
+    def session(self):
+        """
+        Returns the HTTP session with the OSM. Connections are kept open and reused
+        """
+        if self._session is None:
+            session = requests.Session()
+            session.verify = False
+            session.mount("https://", HTTPAdapter(pool_maxsize=POOL_MAXSIZE))
+            self._session = session
+        return self._session
+
+    def validToken(self):
+        """
+        Returns the cached token if it is not about to expire, otherwise a new one
+        """
+        token = self.token
+        if token and time.time() < self.token_expires - TOKEN_EXPIRY_MARGIN:
+            return token
+        return self.getToken(stale_token=token)
+
+    def getToken(self, stale_token=None):
         """
         Returns a valid Token for OSM
+        If stale_token is given and another caller has already replaced it,
+        the new token is returned without a new request
+        """
+        with self._token_lock:
+            if stale_token is not None and self.token != stale_token:
+                return self.token
+            self._requestToken()
+        # return token id
+        return self.token
+
+    def _requestToken(self):
+        """
+        Requests a new token from OSM
         """
         headers = {
             "Content-Type": "application/yaml",
@@ -56,12 +121,24 @@ class Osm:
             + "'}"
         )
         url = f"https://{self.ip}:9999/osm/admin/v1/tokens"
-        response = requests.post(
-            url, headers=headers, data=data, verify=False, timeout=self.timeout
-        )
-        self.token = response.json()["id"]
-        # return token id
-        return self.token
+        response = self.session.post(url, headers=headers, data=data, timeout=self.timeout)
+        token = response.json()
+        self.token = token["id"]
+        # If OSM does not return the expiration, the token is refreshed after a 401
+        self.token_expires = token.get("expires", float("inf"))
+
+    def _request(self, method, url, headers, **kwargs):
+        """
+        Sends an authorized request to OSM
+        Requests a new token and retries if the token is not valid any more
+        """
+        while True:
+            token = self.validToken()
+            headers["Authorization"] = f"Bearer {token}"
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            if response.status_code != 401:
+                return response
+            self.getToken(stale_token=token)
 
     def addVim(self, vimName, vimPassword, vimType, vimUrl, vimUser, secGroup):
         """
@@ -73,18 +150,12 @@ class Osm:
             vim_type: "{3}", vim_url: "{4}", vim_user: "{5}" , config: {6}}}'.format(
             vimName, vimPassword, vimName, vimType, vimUrl, vimUser, secGroup
         )
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.post(osm_url, headers=headers, data=data, verify=False)
-            if response.status_code != 401:
-                vim_id = response.json()["id"]
-                break
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/yaml",
+            "Accept": "application/json",
+        }
+        response = self._request("POST", osm_url, headers, data=data)
+        vim_id = response.json()["id"]
         return vim_id
 
     def instantiateNs(self, nsName, nsdId, vimAccountId):
@@ -97,18 +168,12 @@ class Osm:
         data = "{{ nsName: {0}, nsdId: {1}, vimAccountId: {2} }}".format(
             nsName, nsdId, vimAccountId
         )
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.post(osm_url, headers=headers, data=data, verify=False)
-            if response.status_code != 401:
-                nsId = response.json()
-                break
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/yaml",
+            "Accept": "application/json",
+        }
+        response = self._request("POST", osm_url, headers, data=data)
+        nsId = response.json()
         return nsId["id"]
 
     def getNsr(self, nsId):
@@ -117,18 +182,12 @@ class Osm:
         """
         osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/ns_instances/{nsId}"
         # Get the NSR from NS ID in json format
-        while True:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(osm_url, headers=headers, verify=False)
-            if response.status_code != 401:
-                nsr = response.json()
-                break
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = self._request("GET", osm_url, headers)
+        nsr = response.json()
         return nsr
 
     def getVnfrId(self, nsr):
@@ -144,20 +203,41 @@ class Osm:
         """
         osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/vnf_instances/{vnfrId}"
         # Get the VNFR from VNF ID in json format
-        while True:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(osm_url, headers=headers, verify=False)
-            if response.status_code != 401:
-                vnfr = response.json()
-                break
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = self._request("GET", osm_url, headers)
+        vnfr = response.json()
         return vnfr
 
+    def getNsrList(self, nsIds):
+        """
+        Returns the NSRs for a list of NS IDs, with one request
+        NSs that do not exist are not included
+        """
+        osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/ns_instances"
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = self._request("GET", osm_url, headers, params={"_id": ",".join(nsIds)})
+        return response.json()
+
+    def getVnfrList(self, nsIds):
+        """
+        Returns the VNFRs of a list of NS IDs, with one request
+        """
+        osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/vnf_instances"
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = self._request(
+            "GET", osm_url, headers, params={"nsr-id-ref": ",".join(nsIds)}
+        )
+        return response.json()
+
     def getIPs(self, vnfr):
         """
         Retrieve a list of IPs from a VNFR
@@ -176,130 +256,159 @@ class Osm:
         Terminates and deletes the given ns
         """
         osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/ns_instances_content/" + nsId
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.delete(osm_url, headers=headers, verify=False)
-            if response.status_code != 401:
-                return
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/yaml",
+            "Accept": "application/json",
+        }
+        self._request("DELETE", osm_url, headers)
 
     def deleteVim(self, vimID):
         """
         Deletes the tenant account from the osm
+        An account that does not exist in the osm is already deleted
         """
         osm_url = f"https://{self.ip}:9999/osm/admin/v1/vim_accounts/{vimID}"
         headers = {
             "Content-Type": "application/yaml",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/yaml",
         }
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/yaml",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.delete(osm_url, headers=headers, verify=False)
-            if response.status_code != 401:
-                return
-            else:
-                self.getToken()
+        response = self._request("DELETE", osm_url, headers)
+        if response.status_code != 404:
+            response.raise_for_status()
 
-    def bootstrapNfvo(self):
+    def bootstrapNfvo(self, max_age=None):
         """
         Reads info from NSDs/VNFDs in the NFVO and stores them in mongodb
+        If max_age is given, the NFVO is read only if the stored info is older than max_age seconds
         """
-        self.readVnfd()
-        self.readNsd()
+        if max_age is not None:
+            catalog = mongoUtils.get("nfvo_catalog", self.nfvo_id)
+            if catalog and time.time() - catalog["synced_at"] < max_age:
+                return
+        try:
+            vnfd_changed = self.readVnfd()
+            # The NSD flavors depend on the VNFDs - Read the NSDs again if the VNFDs changed
+            self.readNsd(force=vnfd_changed)
+        except requests.HTTPError as e:
+            # Keep the stored catalog and read it again on the next call
+            logger.warning(f"Failed to read the catalog of NFVO {self.nfvo_id}: {e}")
+            return
+        mongoUtils.update_fields(
+            "nfvo_catalog", self.nfvo_id, {"synced_at": time.time()}, upsert=True
+        )
 
-    def readVnfd(self):
+    def _conditionalGet(self, url, headers, force=False):
+        """
+        Sends a GET request with the validators (ETag, Last-Modified) of the previous response
+        Returns None if the NFVO replies that the content has not changed
+        Raises HTTPError if the NFVO replies with an error
+        """
+        validators = self._catalog_validators.get(url, {})
+        if not force:
+            if "ETag" in validators:
+                headers["If-None-Match"] = validators["ETag"]
+            if "Last-Modified" in validators:
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+        response = self._request("GET", url, headers)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            # Do not use the body or the validators of the response as the catalog
+            response.raise_for_status()
+            return None
+        self._catalog_validators[url] = {
+            key: response.headers[key]
+            for key in ("ETag", "Last-Modified")
+            if key in response.headers
+        }
+        return response.json()
+
+    def readVnfd(self, force=False):
         """
         Reads and returns required information from nsd/vnfd
+        Returns True if the VNFDs were updated
         """
         url = f"https://{self.ip}:9999/osm/vnfpkgm/v1/vnf_packages/"
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(url, headers=headers, verify=False)
-            if response.status_code != 401:
-                osm_vnfd_list = response.json()
+        headers = {
+            "Content-Type": "application/yaml",
+            "Accept": "application/json",
+        }
+        osm_vnfd_list = self._conditionalGet(url, headers, force)
+        if osm_vnfd_list is None:
+            return False
+        vnfd_list = []
+        for osm_vnfd in osm_vnfd_list:
+            if all(key in osm_vnfd for key in ("id", "_id", "mgmt-interface", "vdu")):
                 new_vnfd = {}
-                for osm_vnfd in osm_vnfd_list:
-                    if all(key in osm_vnfd for key in ("id", "_id", "mgmt-interface", "vdu")):
-                        new_vnfd["vnfd-id"] = osm_vnfd["_id"]
-                        new_vnfd["name"] = osm_vnfd["id"]
-                        new_vnfd["flavor"] = {"memory-mb": 0, "vcpu-count": 0, "storage-gb": 0}
-                        instances = 0
-                        for vdu in osm_vnfd["vdu"]:
-                            if "vm-flavor" in vdu.keys():
-                                for key in new_vnfd["flavor"]:
-                                    new_vnfd["flavor"][key] += int(vdu["vm-flavor"][key])
-                                instances += 1
-                        new_vnfd["flavor"]["instances"] = instances
-                        new_vnfd["mgmt"] = osm_vnfd["mgmt-interface"]["cp"]
-                        new_vnfd["nfvo_id"] = self.nfvo_id
-                        new_vnfd["_id"] = str(uuid.uuid4())
-                        try:
-                            mongoUtils.add("vnfd", new_vnfd)
-                        except pymongo.errors.DuplicateKeyError:
-                            continue
-                        new_vnfd = {}
-                break
-            else:
-                self.getToken()
+                new_vnfd["vnfd-id"] = osm_vnfd["_id"]
+                new_vnfd["name"] = osm_vnfd["id"]
+                new_vnfd["flavor"] = {"memory-mb": 0, "vcpu-count": 0, "storage-gb": 0}
+                instances = 0
+                for vdu in osm_vnfd["vdu"]:
+                    if "vm-flavor" in vdu.keys():
+                        for key in new_vnfd["flavor"]:
+                            new_vnfd["flavor"][key] += int(vdu["vm-flavor"][key])
+                        instances += 1
+                new_vnfd["flavor"]["instances"] = instances
+                new_vnfd["mgmt"] = osm_vnfd["mgmt-interface"]["cp"]
+                new_vnfd["nfvo_id"] = self.nfvo_id
+                new_vnfd["_id"] = str(uuid.uuid4())
+                vnfd_list.append(new_vnfd)
+        mongoUtils.upsert_many("vnfd", "vnfd-id", vnfd_list)
+        # Remove the VNFDs that were deleted from the NFVO
+        mongoUtils.delete_all(
+            "vnfd",
+            {"nfvo_id": self.nfvo_id, "vnfd-id": {"$nin": [i["vnfd-id"] for i in vnfd_list]}},
+        )
+        return True
 
-    def readNsd(self):
+    def readNsd(self, force=False):
         """
         Reads and returns required information from nsd/vnfd
+        Returns True if the NSDs were updated
         """
         url = f"https://{self.ip}:9999/osm/nsd/v1/ns_descriptors"
-        while True:
-            headers = {
-                "Content-Type": "application/yaml",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
+        headers = {
+            "Content-Type": "application/yaml",
+            "Accept": "application/json",
+        }
+        osm_nsd_list = self._conditionalGet(url, headers, force)
+        if osm_nsd_list is None:
+            return False
+        # Get all the registered VNFDs of the NFVO at once
+        reg_vnfd_dict = {
+            reg_vnfd["name"]: reg_vnfd
+            for reg_vnfd in mongoUtils.find_all("vnfd", {"nfvo_id": self.nfvo_id})
+        }
+        nsd_list = []
+        for osm_nsd in osm_nsd_list:
+            new_nsd = {}
+            new_nsd["nsd-id"] = osm_nsd["_id"]
+            new_nsd["nsd-name"] = osm_nsd["id"]
+            new_nsd["vnfd_list"] = []
+            new_nsd["flavor"] = {
+                "memory-mb": 0,
+                "vcpu-count": 0,
+                "storage-gb": 0,
+                "instances": 0,
             }
-            response = requests.get(url, headers=headers, verify=False)
-            if response.status_code != 401:
-                osm_nsd_list = response.json()
-                new_nsd = {}
-                for osm_nsd in osm_nsd_list:
-                    new_nsd["nsd-id"] = osm_nsd["_id"]
-                    new_nsd["nsd-name"] = osm_nsd["id"]
-                    new_nsd["vnfd_list"] = []
-                    new_nsd["flavor"] = {
-                        "memory-mb": 0,
-                        "vcpu-count": 0,
-                        "storage-gb": 0,
-                        "instances": 0,
-                    }
-                    for osm_vnfd in osm_nsd["constituent-vnfd"]:
-                        data = {"name": osm_vnfd["vnfd-id-ref"]}
-                        reg_vnfd = mongoUtils.find("vnfd", data)
-                        if not reg_vnfd:
-                            logger.warning("There is a vnfd missing from the NFVO repository")
-                        else:
-                            new_nsd["vnfd_list"].append(reg_vnfd["name"])
-                            for key in new_nsd["flavor"]:
-                                new_nsd["flavor"][key] += reg_vnfd["flavor"][key]
-                    new_nsd["nfvo_id"] = self.nfvo_id
-                    new_nsd["_id"] = str(uuid.uuid4())
-                    try:
-                        mongoUtils.add("nsd", new_nsd)
-                    except pymongo.errors.DuplicateKeyError:
-                        continue
-                    new_nsd = {}
-                break
-            else:
-                self.getToken()
+            for osm_vnfd in osm_nsd["constituent-vnfd"]:
+                reg_vnfd = reg_vnfd_dict.get(osm_vnfd["vnfd-id-ref"])
+                if not reg_vnfd:
+                    logger.warning("There is a vnfd missing from the NFVO repository")
+                else:
+                    new_nsd["vnfd_list"].append(reg_vnfd["name"])
+                    for key in new_nsd["flavor"]:
+                        new_nsd["flavor"][key] += reg_vnfd["flavor"][key]
+            new_nsd["nfvo_id"] = self.nfvo_id
+            new_nsd["_id"] = str(uuid.uuid4())
+            nsd_list.append(new_nsd)
+        mongoUtils.upsert_many("nsd", "nsd-id", nsd_list)
+        # Remove the NSDs that were deleted from the NFVO
+        mongoUtils.delete_all(
+            "nsd", {"nfvo_id": self.nfvo_id, "nsd-id": {"$nin": [i["nsd-id"] for i in nsd_list]}}
+        )
+        return True
 
     def checkNsLife(self, nsId):
         """
@@ -307,16 +416,10 @@ class Osm:
         """
         osm_url = f"https://{self.ip}:9999/osm/nslcm/v1/ns_instances/{nsId}"
         # Get the NSR from NS ID in json format
-        while True:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(osm_url, headers=headers, verify=False)
-            if response.status_code != 401:
-                status = response.status_code
-                break
-            else:
-                self.getToken()
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = self._request("GET", osm_url, headers)
+        status = response.status_code
         return True if status == 404 else False
@@ -1,7 +1,9 @@
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import logging
 from logging import handlers
-from multiprocessing import Process
+import threading
 
 import openstack
 
@@ -18,37 +20,53 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
+# Seconds to wait for a function wrapped with timeout
+TIMEOUT = 5
+# Threads that run the functions wrapped with timeout. They are shared by all the objects
+# of the module
+TIMEOUT_WORKERS = 10
+timeout_executor = ThreadPoolExecutor(
+    max_workers=TIMEOUT_WORKERS, thread_name_prefix="openstack-timeout"
+)
+
+
 def timeout(func):
     """
-    Wrapper for function, terminate after 5 seconds
+    Wrapper for function, raise TimeoutError after 5 seconds
+    Returns the result of the function, or raises its exception
     """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        action = Process(target=func, args=args, kwargs=kwargs)
-        action.start()
-        action.join(timeout=5)
-        if action.is_alive():
-            # terminate function
-            action.terminate()
-            # clean up
-            action.join()
-            raise (TimeoutError)
-        # if process is not 0, is not succesfull
-        if action.exitcode != 0:
-            # raise Attirbute Error, which is the most probable
-            raise (AttributeError)
+        future = timeout_executor.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=TIMEOUT)
+        except futures.TimeoutError:
+            # NOTE: A running thread cannot be terminated, it is left to finish in the
+            # background. If it has not started yet, it is cancelled
+            future.cancel()
+            raise TimeoutError
 
     return wrapper
 
 
+# NOTE: The connections cannot be pickled with the Openstack objects, so they are kept
+# per process, by the credentials of the VIM
+# {credentials: connection}
+connections = {}
+# The roles and users that are looked up on every tenant creation
+# {credentials: {(kind, name): resource}}
+identity_cache = {}
+connections_lock = threading.Lock()
+
+
 class Openstack:
     """
     Class implementing the communication API with OpenStack
     """
 
     # Note: Cannot use conn as a self variable, as it is not possible to
-    # serialize it and store it in a db
+    # serialize it and store it in a db. Use get_connection instead
 
     def __init__(
         self,
@@ -70,14 +88,7 @@ class Openstack:
         self.password = password
         self.user_domain_name = user_domain_name
         self.project_domain_name = project_domain_name
-        conn = openstack.connect(
-            auth_url=self.auth_url,
-            project_name=self.project_name,
-            username=self.username,
-            password=self.password,
-            user_domain_name=self.user_domain_name,
-            project_domain_name=self.project_domain_name,
-        )
+        conn = self.get_connection(authorize=False)
         try:
             conn.authorize()
         except AttributeError as e:
@@ -91,6 +102,73 @@ class Openstack:
             self.auth_error = True
         else:
             self.auth_error = False
+        if self.auth_error:
+            self.reset_connection()
+
+    def credentials(self):
+        """
+        Returns the key of the connection and the identity cache of the VIM
+        """
+        return (
+            self.auth_url,
+            self.project_name,
+            self.username,
+            self.password,
+            self.user_domain_name,
+            self.project_domain_name,
+        )
+
+    def get_connection(self, authorize=True):
+        """
+        Returns the connection to the OpenStack instance
+        The connection is created once per process and its token is reused until it
+        expires, when it is renewed by the connection
+        A new connection is authorized first, unless authorize is False
+        """
+        key = self.credentials()
+        with connections_lock:
+            conn = connections.get(key)
+            if conn is not None:
+                return conn
+            conn = openstack.connect(
+                auth_url=self.auth_url,
+                project_name=self.project_name,
+                username=self.username,
+                password=self.password,
+                user_domain_name=self.user_domain_name,
+                project_domain_name=self.project_domain_name,
+            )
+        if not authorize or not self.openstack_authorize(conn):
+            # Keep only the connections that are authorized
+            with connections_lock:
+                conn = connections.setdefault(key, conn)
+        return conn
+
+    def reset_connection(self):
+        """
+        Drops the cached connection and identity resources of the VIM
+        """
+        key = self.credentials()
+        with connections_lock:
+            connections.pop(key, None)
+            identity_cache.pop(key, None)
+
+    def find_identity(self, conn, kind, name):
+        """
+        Returns a role or a user of the VIM, from the cache if it was found before
+        """
+        key = self.credentials()
+        with connections_lock:
+            resource = identity_cache.get(key, {}).get((kind, name))
+        if resource is None:
+            if kind == "role":
+                resource = conn.identity.find_role(name)
+            else:
+                resource = conn.identity.find_user(name, ignore_missing=False)
+            if resource is not None:
+                with connections_lock:
+                    identity_cache.setdefault(key, {})[(kind, name)] = resource
+        return resource
 
     @timeout
     def openstack_authorize(self, conn):
@@ -130,15 +208,20 @@ class Openstack:
         """
         Compbines newly created project and user
         """
-        userrole = conn.identity.find_role("user")
-        heatrole = conn.identity.find_role("heat_stack_owner")
-        conn.identity.assign_project_role_to_user(project, user, userrole)
-        conn.identity.assign_project_role_to_user(project, user, heatrole)
-        # Add admin user to the project, in order to create the MAC Addresses
-        adminrole = conn.identity.find_role("admin")
-        admin_user = conn.identity.find_user(vim_admin_user, ignore_missing=False)
-        conn.identity.assign_project_role_to_user(project, admin_user, adminrole)
-        conn.identity.assign_project_role_to_user(project, admin_user, heatrole)
+        try:
+            userrole = self.find_identity(conn, "role", "user")
+            heatrole = self.find_identity(conn, "role", "heat_stack_owner")
+            conn.identity.assign_project_role_to_user(project, user, userrole)
+            conn.identity.assign_project_role_to_user(project, user, heatrole)
+            # Add admin user to the project, in order to create the MAC Addresses
+            adminrole = self.find_identity(conn, "role", "admin")
+            admin_user = self.find_identity(conn, "user", vim_admin_user)
+            conn.identity.assign_project_role_to_user(project, admin_user, adminrole)
+            conn.identity.assign_project_role_to_user(project, admin_user, heatrole)
+        except openstack.exceptions.ResourceNotFound:
+            # The cached roles or user may have been replaced on the VIM
+            self.reset_connection()
+            raise
 
     def create_sec_group(self, conn, name, project):
         """
@@ -174,15 +257,7 @@ class Openstack:
         """
         Deletes user and project
         """
-        conn = openstack.connect(
-            auth_url=self.auth_url,
-            project_name=self.project_name,
-            username=self.username,
-            password=self.password,
-            user_domain_name=self.user_domain_name,
-            project_domain_name=self.project_domain_name,
-        )
-        self.openstack_authorize(conn)
+        conn = self.get_connection()
         user_name = tenant
         proj_name = tenant
 
@@ -235,15 +310,7 @@ class Openstack:
         """
         Creates the tenant (project, user, security_group) on the specivied vim
         """
-        conn = openstack.connect(
-            auth_url=self.auth_url,
-            project_name=self.project_name,
-            username=self.username,
-            password=self.password,
-            user_domain_name=self.user_domain_name,
-            project_domain_name=self.project_domain_name,
-        )
-        self.openstack_authorize(conn)
+        conn = self.get_connection()
         # creates the project in Openstack
         project = self.create_project(conn, tenant_project_name, tenant_project_description)
 
@@ -269,15 +336,7 @@ class Openstack:
     #  - https://docs.openstack.org/openstacksdk/latest/user/connection.html
     #
     def get_resources(self):
-        conn = openstack.connect(
-            auth_url=self.auth_url,
-            project_name=self.project_name,
-            username=self.username,
-            password=self.password,
-            user_domain_name=self.user_domain_name,
-            project_domain_name=self.project_domain_name,
-        )
-        self.openstack_authorize(conn)
+        conn = self.get_connection()
         resources = conn.list_hypervisors()
         compute_nodes = 0
         report = {
@@ -1,6 +1,15 @@
+from collections import OrderedDict
+import copy
+from datetime import datetime, timedelta
+import hashlib
+import json
 import logging
 from logging import handlers
-import uuid
+import os
+import threading
+import time
+
+import pymongo
 
 from katana.shared_utils.mongoUtils import mongoUtils
 
@@ -49,6 +58,20 @@ SERVICE_DES_LIST = ("ns_list",)
 TEST_DES_OBJ = ("performance_monitoring", "performance_prediction")
 TEST_DES_LIST = ("probe_list",)
 
+# Max number of times that the functions of a slice are selected, if they are taken by
+# other slices in the meantime
+CLAIM_ATTEMPTS = 3
+
+# The mapping plans of the last GSTs {GST hash: (catalog version, plan)}
+# NOTE: The cache is kept per NBI process. The catalog version is stored in mongo, so a
+# change of the functions or the slice descriptors invalidates the plans of all processes
+MAPPING_CACHE_SIZE = 256
+mapping_cache = OrderedDict()
+cache_lock = threading.Lock()
+CATALOG_ID = "mapping"
+# Seconds that a GST is kept after the last slice that uses it is released
+GST_RETENTION = int(os.getenv("KATANA_GST_RETENTION", 7 * 86400))
+
 
 # Calculate the Required generation
 def calc_find_data(gen, location, func):
@@ -62,14 +85,231 @@ def calc_find_data(gen, location, func):
         return {"location": location, "gen": 4, "func": func}
 
 
-def nest_mapping(req):
+def capacity(function):
     """
-    Function that maps nest to the underlying network functions
+    Returns the max number of slices that can use the function, or None if it is unlimited
     """
-    # Store the gst in DB
-    mongoUtils.add("gst", req)
+    shared = function.get("shared") or {}
+    if not shared.get("availability"):
+        return 1
+    return shared.get("max_shared")
+
+
+def load(function):
+    """
+    Returns the sort key of the function - The least loaded function is selected first and
+    the functions with the same load are sorted by id
+    """
+    return len(function["tenants"]), function["id"]
+
+
+def find_candidates(gen, locations):
+    """
+    Find the core and radio functions on the given locations with a single query
+    """
+    find_data = calc_find_data(gen, {"$in": list(set(locations))}, {"$in": [0, 1]})
+    return list(mongoUtils.find_all("func", find_data))
+
+
+def pick_functions(candidates):
+    """
+    Returns the least loaded function of each type on each location that can be used by
+    one more slice {(location, func): function}
+    """
+    functions = {}
+    for function in candidates:
+        max_tenants = capacity(function)
+        if max_tenants is not None and len(function["tenants"]) >= max_tenants:
+            continue
+        key = (function["location"], function["func"])
+        if key not in functions or load(function) < load(functions[key]):
+            functions[key] = function
+    return functions
+
+
+def select_functions(candidates, coverage, sst):
+    """
+    Selects the core and radio functions of the slice
+    Returns the connections, the selected functions and the locations that are not
+    supported, or an error message
+    """
+    functions = pick_functions(candidates)
+    connections = []
+    selected = []
+    not_supp_loc = []
+    if sst == 1:
+        # EMBB: The EPC is placed on the Core
+        epc = functions.get(("Core", 0))
+        if not epc:
+            return None, "Error: Not available Core Network Functions"
+        for location in coverage:
+            enb = functions.get((location, 1))
+            if not enb:
+                not_supp_loc.append(location)
+            else:
+                connections.append({"core": epc, "radio": enb})
+                selected.append(enb)
+        if not connections:
+            return None, "Error: Not available Network Functions"
+        selected.append(epc)
+    else:
+        # URLLC: The EPC is placed on the Edge
+        for location in coverage:
+            epc = functions.get((location, 0))
+            enb = functions.get((location, 1))
+            if not epc or not enb:
+                not_supp_loc.append(location)
+            else:
+                connections.append({"core": epc, "radio": enb})
+                selected.extend([epc, enb])
+        if not connections:
+            return None, "Error: Not available Network Functions"
+    return (connections, selected, not_supp_loc), None
+
+
+def claim_functions(slice_id, selected):
+    """
+    Adds the slice to the tenants of the selected functions with one bulk write
+    A function is updated only if it has not reached its capacity, so concurrent slices
+    cannot exceed it. If any of the functions is not updated, the slice is removed from
+    all of them and False is returned
+    """
+    functions = {function["_id"]: function for function in selected}
+    updates = []
+    for func_id, function in functions.items():
+        find_data = {"_id": func_id}
+        max_tenants = capacity(function)
+        if max_tenants is not None:
+            # The array has less than max_tenants items
+            find_data[f"tenants.{max_tenants - 1}"] = {"$exists": False}
+        updates.append((find_data, {"$addToSet": {"tenants": slice_id}}))
+    result = mongoUtils.bulk_update("func", updates)
+    if result and result.matched_count < len(updates):
+        mongoUtils.bulk_update(
+            "func", [({"_id": {"$in": list(functions)}}, {"$pull": {"tenants": slice_id}})]
+        )
+        return False
+    for function in functions.values():
+        function["tenants"].append(slice_id)
+    return True
+
+
+def content_hash(data):
+    """
+    Returns the hash of the canonical JSON of a GST or a slice descriptor, without its _id
+    """
+    data = {key: value for key, value in data.items() if key != "_id"}
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def store_gst(gst_id, gst, slice_id):
+    """
+    Stores a GST once, addressed by the hash of its content, and adds the slice to the
+    slices that use it
+    If the GST was released by all its slices, it does not expire anymore
+    """
+    mongoUtils.bulk_upsert(
+        "gst",
+        [
+            (
+                {"_id": gst_id},
+                {
+                    "$setOnInsert": dict(gst, created_at=time.time()),
+                    "$addToSet": {"slices": slice_id},
+                    "$unset": {"expire_at": ""},
+                },
+            )
+        ],
+    )
 
-    nest = {"_id": req["_id"]}
+
+def release_slice(nest):
+    """
+    Reverts the mapping of a slice that will not be created
+    Removes the slice from the tenants of its functions and from the slices of its GST.
+    The GST expires after GST_RETENTION if no other slice uses it
+    """
+    if nest.get("functions"):
+        mongoUtils.bulk_update(
+            "func", [({"_id": {"$in": nest["functions"]}}, {"$pull": {"tenants": nest["_id"]}})]
+        )
+    if nest.get("gst_id"):
+        expire_at = datetime.utcnow() + timedelta(seconds=GST_RETENTION)
+        mongoUtils.bulk_update(
+            "gst",
+            [
+                ({"_id": nest["gst_id"]}, {"$pull": {"slices": nest["_id"]}}),
+                (
+                    {"_id": nest["gst_id"], "slices": {"$size": 0}},
+                    {"$set": {"expire_at": expire_at}},
+                ),
+            ],
+        )
+
+
+def store_slice_des(slice_des):
+    """
+    Stores a new base slice descriptor, addressed by the hash of its content
+    """
+    if mongoUtils.find(
+        "base_slice_des_ref", {"base_slice_des_id": slice_des["base_slice_des_id"]}
+    ):
+        return
+    slice_des["_id"] = content_hash(slice_des)
+    try:
+        mongoUtils.add("base_slice_des_ref", slice_des)
+    except pymongo.errors.DuplicateKeyError:
+        # The same descriptor was stored by another slice
+        pass
+
+
+def catalog_version():
+    """
+    Returns the version of the functions and the slice descriptors used by the mapping
+    """
+    catalog = mongoUtils.get("catalog", CATALOG_ID)
+    return catalog["version"] if catalog else 0
+
+
+def catalog_changed():
+    """
+    Increases the catalog version, so the cached mapping plans are not used again
+    Must be called when a function or a slice descriptor is added, modified or deleted
+    """
+    mongoUtils.bulk_upsert("catalog", [({"_id": CATALOG_ID}, {"$inc": {"version": 1}})])
+
+
+def cached_plan(key, version):
+    """
+    Returns the cached mapping plan of a GST, if it was created with the given catalog
+    version
+    """
+    with cache_lock:
+        entry = mapping_cache.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        mapping_cache.move_to_end(key)
+        return entry[1]
+
+
+def cache_plan(key, version, plan):
+    """
+    Stores the mapping plan of a GST and drops the least recently used plans
+    """
+    with cache_lock:
+        mapping_cache[key] = (version, plan)
+        mapping_cache.move_to_end(key)
+        while len(mapping_cache) > MAPPING_CACHE_SIZE:
+            mapping_cache.popitem(last=False)
+
+
+def create_plan(req):
+    """
+    Maps the GST to the slice type and the candidate functions
+    Returns the mapping plan, or an error message
+    """
+    plan = {"nest": {}}
 
     # Recreate the nest req
     for field in NEST_FIELDS:
@@ -78,7 +318,7 @@ def nest_mapping(req):
     # ****** STEP 1: Slice Descriptor ******
     if not req["base_slice_descriptor"]:
         logger.error("No Base Slice Descriptor given - Exit")
-        return "NEST Error: No Base Slice Descriptor given", 400
+        return None, "NEST Error: No Base Slice Descriptor given"
     req_slice_des = req["base_slice_descriptor"]
     # *** Recreate the NEST ***
     for req_key in SLICE_DES_OBJ:
@@ -102,7 +342,7 @@ def nest_mapping(req):
             logger.error(
                 "slice_descriptor {} not found".format(req_slice_des["base_slice_des_ref"])
             )
-            return "Error: referenced slice_descriptor not found", 400
+            return None, "Error: referenced slice_descriptor not found"
 
     # *************************** Start the mapping ***************************
     # Currently supports:
@@ -110,8 +350,6 @@ def nest_mapping(req):
     #    If EMBB --> EPC Placement=@Core. If URLLC --> EPC Placement=@Edge
     # 2) If network throughput > 100 Mbps --> Type=5G
     # *************************************************************************
-    functions_list = []
-
     if req_slice_des["network_DL_throughput"]["guaranteed"] > 100000:
         gen = 5
     else:
@@ -120,54 +358,16 @@ def nest_mapping(req):
     # *** Calculate the type of the slice (sst) ***
     if req_slice_des["delay_tolerance"]:
         # EMBB
-        nest["sst"] = 1
-        epc = mongoUtils.find("func", calc_find_data(gen, "Core", 0))
-        if not epc:
-            return "Error: Not available Core Network Functions", 400
-        connections = []
-        not_supp_loc = []
-        for location in req_slice_des["coverage"]:
-            enb = mongoUtils.find("func", calc_find_data(gen, location, 1))
-            if not enb:
-                not_supp_loc.append(location)
-            else:
-                connections.append({"core": epc, "radio": enb})
-                enb["tenants"].append(nest["_id"])
-                mongoUtils.update("func", enb["_id"], enb)
-                functions_list.append(enb["_id"])
-        if not epc or not connections:
-            return "Error: Not available Network Functions", 400
-        epc["tenants"].append(nest["_id"])
-        mongoUtils.update("func", epc["_id"], epc)
-        functions_list.append(epc["_id"])
-        for location in not_supp_loc:
-            logger.warning(f"Location {location} not supported")
-            req_slice_des["coverage"].remove(location)
+        plan["sst"] = 1
+        locations = ["Core"] + req_slice_des["coverage"]
     else:
         # URLLC
-        nest["sst"] = 2
-        connections = []
-        not_supp_loc = []
-        for location in req_slice_des["coverage"]:
-            epc = mongoUtils.find("func", calc_find_data(gen, location, 0))
-            enb = mongoUtils.find("func", calc_find_data(gen, location, 1))
-            if not epc or not enb:
-                not_supp_loc.append(location)
-            else:
-                connections.append({"core": epc, "radio": enb})
-                epc["tenants"].append(nest["_id"])
-                enb["tenants"].append(nest["_id"])
-                mongoUtils.update("func", enb["_id"], enb)
-                mongoUtils.update("func", epc["_id"], epc)
-                functions_list.extend([epc["_id"], enb["_id"]])
-        if not connections:
-            return "Error: Not available Network Functions", 400
-        for location in not_supp_loc:
-            logger.warning(f"Location {location} not supported")
-            req_slice_des["coverage"].remove(location)
+        plan["sst"] = 2
+        locations = req_slice_des["coverage"]
 
-    nest["connections"] = connections
-    nest["functions"] = functions_list
+    # The functions are selected when the slice is created, based on their current load
+    plan["candidates"] = [function["_id"] for function in find_candidates(gen, locations)]
+    plan["coverage"] = list(req_slice_des["coverage"])
 
     # Values to be copied to NEST
     KEYS_TO_BE_COPIED = (
@@ -182,13 +382,12 @@ def nest_mapping(req):
         "radio_spectrum",
         "device_velocity",
         "terminal_density",
-        "coverage",
     )
     for key in KEYS_TO_BE_COPIED:
-        nest[key] = req_slice_des[key]
+        plan["nest"][key] = req_slice_des[key]
 
     # Create the shared value
-    nest["shared"] = {
+    plan["nest"]["shared"] = {
         "isolation": req_slice_des["isolation_level"],
         "simultaneous_nsi": req_slice_des["simultaneous_nsi"],
     }
@@ -202,7 +401,7 @@ def nest_mapping(req):
         for req_key in SERVICE_DES_LIST:
             req_service_des[req_key] = req_service_des.get(req_key, [])
         # Create the NS field on Nest
-        nest["ns_list"] = req_service_des["ns_list"]
+        plan["nest"]["ns_list"] = req_service_des["ns_list"]
 
         # # Replace Placement with location in each NS
         # for ns in nest["ns_list"]:
@@ -219,13 +418,71 @@ def nest_mapping(req):
         for req_key in TEST_DES_LIST:
             req_test_des[req_key] = req_test_des.get(req_key, [])
         # Create the Probe field on Nest
-        nest["probe_list"] = req_test_des["probe_list"]
+        plan["nest"]["probe_list"] = req_test_des["probe_list"]
 
-    if not mongoUtils.find(
-        "base_slice_des_ref",
-        {"base_slice_des_id": req["base_slice_descriptor"]["base_slice_des_id"]},
-    ):
-        new_uuid = str(uuid.uuid4())
-        req["base_slice_descriptor"]["_id"] = new_uuid
-        mongoUtils.add("base_slice_des_ref", req["base_slice_descriptor"])
+    # The plan is shared by the slices of the same GST
+    plan = copy.deepcopy(plan)
+    return plan, None
+
+
+def build_nest(slice_id, plan):
+    """
+    Creates the NEST of a slice from a mapping plan
+    Selects the least loaded candidate functions and adds the slice to their tenants
+    """
+    nest = copy.deepcopy(plan["nest"])
+    nest["_id"] = slice_id
+    nest["sst"] = plan["sst"]
+    coverage = list(plan["coverage"])
+
+    # Select the functions and add the slice to their tenants. If another slice takes a
+    # function that reached its capacity in the meantime, select again
+    for _ in range(CLAIM_ATTEMPTS):
+        candidates = mongoUtils.find_all("func", {"_id": {"$in": plan["candidates"]}})
+        selection, error = select_functions(list(candidates), coverage, plan["sst"])
+        if error:
+            return error, 400
+        connections, selected, not_supp_loc = selection
+        if claim_functions(slice_id, selected):
+            break
+        logger.warning("The selected functions are no longer available - Selecting again")
+    else:
+        return "Error: Not available Network Functions", 400
+    for location in not_supp_loc:
+        logger.warning(f"Location {location} not supported")
+        coverage.remove(location)
+
+    nest["connections"] = connections
+    nest["functions"] = [function["_id"] for function in selected]
+    nest["coverage"] = coverage
+    return nest, 0
+
+
+def nest_mapping(req):
+    """
+    Function that maps nest to the underlying network functions
+    The mapping plans of the GSTs are cached, so the same GST is mapped only once for
+    every version of the catalog
+    """
+    gst = copy.deepcopy({key: value for key, value in req.items() if key != "_id"})
+    key = content_hash(gst)
+    version = catalog_version()
+    plan = cached_plan(key, version)
+    new_plan = plan is None
+    if new_plan:
+        plan, error = create_plan(req)
+        if error:
+            return error, 400
+        cache_plan(key, version, plan)
+
+    nest, error_code = build_nest(req["_id"], plan)
+    if error_code:
+        return nest, error_code
+
+    # Store the gst in DB
+    store_gst(key, gst, req["_id"])
+    nest["gst_id"] = key
+
+    if new_plan:
+        store_slice_des(req["base_slice_descriptor"])
     return nest, 0
@@ -0,0 +1,150 @@
+from collections.abc import Mapping
+import json
+import logging
+from logging import handlers
+import zlib
+
+from bson import json_util
+from bson.raw_bson import RawBSONDocument
+from flask import Response, request
+
+try:
+    import bsonjs
+except ImportError:
+    bsonjs = None
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+MIMETYPE = "application/json"
+# The supported content encodings, with the zlib wbits of each one
+ENCODINGS = {"gzip": 31, "deflate": 15}
+# Responses smaller than this (in bytes) are not compressed
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+# Size (in bytes) of the chunks of the streamed responses
+CHUNK_SIZE = 65536
+
+
+def default(obj):
+    """
+    Converts the values that are not supported by the JSON encoder
+    """
+    try:
+        return json_util.default(obj)
+    except TypeError:
+        pass
+    if isinstance(obj, Mapping):
+        # RawBSONDocument
+        return dict(obj)
+    if isinstance(obj, Exception):
+        return str(obj)
+    if hasattr(obj, "__iter__"):
+        # Cursors and generators
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# NOTE: The C encoder of the json module is used and json_util is called only for the
+# values that are not JSON types (ObjectId, datetime, Binary...), so the output is the
+# same with bson.json_util.dumps
+encoder = json.JSONEncoder(default=default)
+
+
+def dumps(obj):
+    """
+    Returns the JSON string of an object
+    """
+    return encoder.encode(obj)
+
+
+def raw_dumps(doc):
+    """
+    Returns the JSON string of a RawBSONDocument
+    If bsonjs is installed, the BSON is transcoded to JSON without being decoded
+    """
+    if bsonjs is not None and isinstance(doc, RawBSONDocument):
+        return bsonjs.dumps(doc.raw)
+    return dumps(doc)
+
+
+def accepted_encoding():
+    """
+    Returns the content encoding that is accepted by the client, or None
+    """
+    return request.accept_encodings.best_match(list(ENCODINGS), default=None)
+
+
+def compressor(encoding):
+    """
+    Returns a zlib compressor for the content encoding
+    """
+    return zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, ENCODINGS[encoding])
+
+
+def response(obj, status=200, headers=None, encode=dumps):
+    """
+    Returns the JSON response of an object, compressed if the client accepts it
+    """
+    headers = dict(headers or {}, Vary="Accept-Encoding")
+    body = encode(obj).encode("utf-8")
+    encoding = accepted_encoding()
+    if encoding and len(body) >= COMPRESS_MIN_SIZE:
+        comp = compressor(encoding)
+        body = comp.compress(body) + comp.flush()
+        headers["Content-Encoding"] = encoding
+    return Response(body, status=status, headers=headers, mimetype=MIMETYPE)
+
+
+def stream(items, status=200, headers=None, encode=dumps):
+    """
+    Returns a chunked response with the JSON list of the items
+    The items are encoded while the response is sent, so the whole list is not kept in
+    memory
+    """
+    headers = dict(headers or {}, Vary="Accept-Encoding")
+    encoding = accepted_encoding()
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    def generate():
+        comp = compressor(encoding) if encoding else None
+        buffer, size = ["["], 1
+        for i, item in enumerate(items):
+            chunk = encode(item)
+            buffer.append(", " + chunk if i else chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                data = "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+                data = comp.compress(data) if comp else data
+                if data:
+                    yield data
+        buffer.append("]")
+        data = "".join(buffer).encode("utf-8")
+        yield comp.compress(data) + comp.flush() if comp else data
+
+    return Response(generate(), status=status, headers=headers, mimetype=MIMETYPE)
+
+
+def raw_response(doc, status=200, headers=None):
+    """
+    Returns the JSON response of a RawBSONDocument
+    """
+    return response(doc, status, headers, encode=raw_dumps)
+
+
+def raw_stream(docs, status=200, headers=None):
+    """
+    Returns a chunked response with the JSON list of RawBSONDocuments
+    """
+    return stream(docs, status, headers, encode=raw_dumps)
@@ -0,0 +1,70 @@
+import logging
+from logging import handlers
+
+from flask import request
+
+from katana.shared_utils.mongoUtils import mongoUtils
+from katana.utils.jsonUtils import jsonUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+# Max number of documents that are returned in one page
+MAX_LIMIT = 1000
+# The response header with the cursor of the next page
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_args():
+    """
+    Returns the limit and the after cursor of the request
+    limit: The max number of documents in the page. 0 returns all the documents
+    after: The _id of the last document of the previous page
+    Raises ValueError if the limit is not valid
+    """
+    limit = int(request.args.get("limit", 0))
+    if limit < 0:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_LIMIT), request.args.get("after")
+
+
+def filter_args(filters):
+    """
+    Returns the filter of the query parameters that are given in the request
+    filters: The query parameters that are accepted as filters
+    """
+    return {field: request.args[field] for field in filters if field in request.args}
+
+
+def list_response(collection_name, projection, formatter, filters=()):
+    """
+    Returns a page of the documents of a collection, sorted by _id
+    Only the projected fields are read from the database and every document is converted
+    by the formatter. If there are more documents, the _id of the last document is returned
+    in the X-Next-Cursor header, to be used as the after parameter of the next request
+    """
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return f"Error: {e}", 400
+    data = filter_args(filters)
+    if not limit:
+        # Stream all the documents from the cursor
+        cursor = mongoUtils.index(collection_name, data, projection, after=after)
+        return jsonUtils.stream(formatter(doc) for doc in cursor)
+    # Read one more document to know if there is a next page
+    docs = list(mongoUtils.index(collection_name, data, projection, limit=limit + 1, after=after))
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers[CURSOR_HEADER] = str(docs[-1]["_id"])
+    return jsonUtils.stream((formatter(doc) for doc in docs), headers=headers)
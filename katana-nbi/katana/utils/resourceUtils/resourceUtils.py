@@ -0,0 +1,209 @@
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from logging import handlers
+import os
+import random
+import socket
+import threading
+import time
+
+from katana.shared_utils.adapterUtils import adapterUtils
+from katana.shared_utils.mongoUtils import mongoUtils
+from katana.utils.timeseriesUtils import timeseriesUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+# Seconds between the scheduled refreshes of the VIM resources
+REFRESH_INTERVAL = int(os.getenv("KATANA_RESOURCE_REFRESH_INTERVAL", 300))
+# Max fraction of the interval that is randomly added or removed on every round, so the
+# workers of the NBI do not check the VIMs at the same time
+REFRESH_JITTER = 0.2
+# Seconds that a process can refresh the resources of a VIM before another process can
+# take it over
+REFRESH_LEASE = 60
+# Max number of VIMs that are refreshed at the same time
+REFRESH_WORKERS = 10
+# Seconds that a reader waits for fresh resources
+WAIT_TIMEOUT = 30
+WAIT_INTERVAL = 0.5
+# The types of the VIMs that report their resources
+MONITORED_TYPES = ("openstack", "Openstack", "opennebula")
+
+# The id of this process
+WORKER_ID = "{0}-{1}".format(socket.gethostname(), os.getpid())
+
+executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="resource-refresh")
+# The refreshes that are running in this process {vim_id: future}
+inflight = {}
+lock = threading.Lock()
+monitor_thread = None
+
+
+def stale_filter(max_age, filter_data=None, refreshing=False):
+    """
+    Returns the filter for the VIMs whose resources are older than max_age seconds
+    If refreshing is set, only the VIMs that are being refreshed are matched
+    """
+    now = time.time()
+    conditions = [
+        {"type": {"$in": MONITORED_TYPES}},
+        {
+            "$or": [
+                {"resources_updated_at": {"$exists": False}},
+                {"resources_updated_at": {"$lt": now - max_age}},
+            ]
+        },
+    ]
+    if refreshing:
+        conditions.append({"resources_refresh.expires": {"$gte": now}})
+    if filter_data:
+        conditions.append(filter_data)
+    return {"$and": conditions}
+
+
+def claim(vim_id):
+    """
+    Marks that this process refreshes the resources of the VIM
+    Returns None if the VIM is refreshed by another process
+    """
+    now = time.time()
+    return mongoUtils.find_and_update(
+        "vim",
+        {
+            "id": vim_id,
+            "$or": [
+                {"resources_refresh": {"$exists": False}},
+                {"resources_refresh.expires": {"$lt": now}},
+            ],
+        },
+        {"resources_refresh": {"owner": WORKER_ID, "expires": now + REFRESH_LEASE}},
+    )
+
+
+def refresh_vim(vim_id):
+    """
+    Gets the resources of a VIM and stores them, with the time they were read
+    Returns the resources, or None if they were not read by this process
+    """
+    vim = claim(vim_id)
+    if not vim:
+        return None
+    resources = None
+    try:
+        vim_obj = adapterUtils.get("vim", vim_id)
+        resources = vim_obj.get_resources()
+    except Exception as e:
+        logger.warning(f"Failed to get the resources of VIM {vim_id}: {e}")
+        mongoUtils.update_fields("vim", vim["_id"], {}, unset_data=["resources_refresh"])
+    else:
+        updated_at = time.time()
+        mongoUtils.update_fields(
+            "vim",
+            vim["_id"],
+            {"resources": resources, "resources_updated_at": updated_at},
+            unset_data=["resources_refresh"],
+        )
+        # Keep the history of the resources
+        try:
+            timeseriesUtils.add_sample(vim_id, resources, updated_at)
+        except Exception as e:
+            logger.warning(f"Failed to store the resource history of VIM {vim_id}: {e}")
+    return resources
+
+
+def refresh(vim_ids):
+    """
+    Refreshes the resources of the given VIMs in parallel
+    A VIM that is already being refreshed by this process is not refreshed again
+    Returns the futures of the refreshes
+    """
+    # Drop the adapters of the VIMs that changed
+    adapterUtils.sync()
+    vim_futures = []
+    with lock:
+        for vim_id in vim_ids:
+            future = inflight.get(vim_id)
+            if future is None:
+                future = executor.submit(refresh_vim, vim_id)
+                inflight[vim_id] = future
+                future.add_done_callback(lambda f, vim_id=vim_id: done(vim_id, f))
+            vim_futures.append(future)
+    return vim_futures
+
+
+def done(vim_id, future):
+    """
+    Removes a completed refresh
+    """
+    with lock:
+        if inflight.get(vim_id) is future:
+            del inflight[vim_id]
+
+
+def refresh_all():
+    """
+    Refreshes the resources of all the VIMs
+    """
+    vim_list = mongoUtils.find_all("vim", {"type": {"$in": MONITORED_TYPES}})
+    return refresh([vim["id"] for vim in vim_list])
+
+
+def refresh_stale(max_age, filter_data=None):
+    """
+    Refreshes the VIMs whose resources are older than max_age seconds
+    """
+    vim_list = mongoUtils.find_all("vim", stale_filter(max_age, filter_data))
+    return refresh([vim["id"] for vim in vim_list])
+
+
+def ensure_fresh(max_age, filter_data=None):
+    """
+    Refreshes the VIMs whose resources are older than max_age seconds and waits until they
+    are refreshed, by this or by another process
+    """
+    deadline = time.time() + WAIT_TIMEOUT
+    futures.wait(refresh_stale(max_age, filter_data), timeout=WAIT_TIMEOUT)
+    while time.time() < deadline:
+        if not mongoUtils.find("vim", stale_filter(max_age, filter_data, refreshing=True)):
+            break
+        time.sleep(WAIT_INTERVAL)
+
+
+def monitor():
+    """
+    Refreshes the resources of the VIMs that have not been refreshed during the last
+    interval
+    """
+    # Start the workers at different times
+    time.sleep(random.uniform(0, REFRESH_INTERVAL * REFRESH_JITTER))
+    while True:
+        try:
+            refresh_stale(REFRESH_INTERVAL * (1 - REFRESH_JITTER))
+        except Exception as e:
+            logger.exception(f"Failed to refresh the VIM resources: {e}")
+        time.sleep(REFRESH_INTERVAL * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER))
+
+
+def start_monitor():
+    """
+    Starts the resource monitor of this process, if it is not running
+    """
+    global monitor_thread
+
+    with lock:
+        if monitor_thread is None or not monitor_thread.is_alive():
+            monitor_thread = threading.Thread(
+                target=monitor, name="resource-monitor", daemon=True
+            )
+            monitor_thread.start()
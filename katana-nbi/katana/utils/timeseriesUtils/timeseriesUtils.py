@@ -0,0 +1,155 @@
+from datetime import datetime
+import logging
+from logging import handlers
+import numbers
+
+from katana.shared_utils.mongoUtils import mongoUtils
+
+# Logging Parameters
+logger = logging.getLogger(__name__)
+file_handler = handlers.RotatingFileHandler("katana.log", maxBytes=10000, backupCount=5)
+stream_handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+stream_formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+file_handler.setFormatter(formatter)
+stream_handler.setFormatter(stream_formatter)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(file_handler)
+logger.addHandler(stream_handler)
+
+TS_COLLECTION = "vim_resources_ts"
+
+# The VIM resources that are kept in the history
+METRICS = (
+    "memory_mb",
+    "free_ram_mb",
+    "vcpus",
+    "vcpus_used",
+    "local_gb",
+    "local_gb_used",
+    "running_vms",
+)
+
+# The resolutions of the history, with the seconds covered by each bucket and the seconds
+# that a bucket is kept after it ends
+# raw: Every sample, grouped in buckets of 1 hour
+# 1m, 1h: The count, sum, min and max of the samples in each minute or hour
+RESOLUTIONS = {
+    "raw": {"bucket": 3600, "retention": 2 * 86400},
+    "1m": {"bucket": 60, "retention": 7 * 86400},
+    "1h": {"bucket": 3600, "retention": 365 * 86400},
+}
+
+
+def bucket_start(timestamp, resolution):
+    """
+    Returns the start of the bucket of a resolution that includes the timestamp
+    """
+    bucket = RESOLUTIONS[resolution]["bucket"]
+    return int(timestamp // bucket * bucket)
+
+
+def bucket_keys(vim_id, resolution, start):
+    """
+    Returns the fields that are set when the bucket is created
+    """
+    config = RESOLUTIONS[resolution]
+    return {
+        "vim_id": vim_id,
+        "resolution": resolution,
+        "start": start,
+        "expire_at": datetime.utcfromtimestamp(start + config["bucket"] + config["retention"]),
+    }
+
+
+def add_sample(vim_id, resources, timestamp):
+    """
+    Adds the resources of a VIM to the history
+    The sample is added to its raw bucket and to the aggregates of all the other
+    resolutions with one bulk write
+    """
+    sample = {
+        metric: resources[metric]
+        for metric in METRICS
+        if isinstance(resources.get(metric), numbers.Number)
+    }
+    if not sample:
+        return None
+    updates = []
+    for resolution in RESOLUTIONS:
+        start = bucket_start(timestamp, resolution)
+        _id = "{0}:{1}:{2}".format(vim_id, resolution, start)
+        update = {"$setOnInsert": bucket_keys(vim_id, resolution, start), "$inc": {"count": 1}}
+        if resolution == "raw":
+            update["$push"] = {"samples": dict(sample, t=timestamp)}
+        else:
+            update["$inc"].update({f"sum.{metric}": value for metric, value in sample.items()})
+            update["$min"] = {f"min.{metric}": value for metric, value in sample.items()}
+            update["$max"] = {f"max.{metric}": value for metric, value in sample.items()}
+        updates.append(({"_id": _id}, update))
+    return mongoUtils.bulk_upsert(TS_COLLECTION, updates)
+
+
+def merge(window, count, sums, mins, maxs):
+    """
+    Adds the aggregates of a bucket or a sample to a window
+    """
+    window["count"] += count
+    for metric, value in sums.items():
+        window["sum"][metric] = window["sum"].get(metric, 0) + value
+    for metric, value in mins.items():
+        window["min"][metric] = min(window["min"].get(metric, value), value)
+    for metric, value in maxs.items():
+        window["max"][metric] = max(window["max"].get(metric, value), value)
+
+
+def history(vim_id, resolution, since, until, window=None):
+    """
+    Returns the aggregates (avg, min, max) of the VIM resources for every window between
+    since and until
+    The window defaults to the bucket of the resolution, or to every sample for the raw
+    resolution. Larger windows are created by merging the buckets
+    """
+    bucket = RESOLUTIONS[resolution]["bucket"]
+    if resolution == "raw":
+        window = max(int(window or 1), 1)
+    else:
+        window = max(int(window or bucket) // bucket * bucket, bucket)
+    data = {
+        "vim_id": vim_id,
+        "resolution": resolution,
+        "start": {"$gte": bucket_start(since, resolution), "$lt": until},
+    }
+    windows = {}
+    for doc in mongoUtils.find_all(TS_COLLECTION, data):
+        if resolution == "raw":
+            points = [
+                (sample.pop("t"), 1, sample, sample, sample)
+                for sample in doc.get("samples", [])
+                if since <= sample["t"] < until
+            ]
+        else:
+            points = [(doc["start"], doc["count"], doc["sum"], doc["min"], doc["max"])]
+        for start, count, sums, mins, maxs in points:
+            window_start = int(start // window * window)
+            window_data = windows.setdefault(
+                window_start, {"count": 0, "sum": {}, "min": {}, "max": {}}
+            )
+            merge(window_data, count, sums, mins, maxs)
+    result = []
+    for window_start in sorted(windows):
+        window_data = windows[window_start]
+        result.append(
+            {
+                "start": window_start,
+                "end": window_start + window,
+                "count": window_data["count"],
+                "avg": {
+                    metric: value / window_data["count"]
+                    for metric, value in window_data["sum"].items()
+                },
+                "min": window_data["min"],
+                "max": window_data["max"],
+            }
+        )
+    return result
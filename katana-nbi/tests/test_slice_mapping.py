@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+# The slice mapping catches the duplicate key errors of pymongo
+pytest.importorskip("pymongo")
+
+from katana.slice_mapping import slice_mapping  # noqa: E402
+
+
+def function(func_id, location="Core", func=0, tenants=(), shared=None):
+    """
+    Returns a function document
+    """
+    return {
+        "_id": "_" + func_id,
+        "id": func_id,
+        "location": location,
+        "func": func,
+        "tenants": list(tenants),
+        "shared": shared,
+    }
+
+
+def test_capacity():
+    assert slice_mapping.capacity(function("a")) == 1
+    assert slice_mapping.capacity(function("a", shared={"availability": False})) == 1
+    assert slice_mapping.capacity(function("a", shared={"availability": True})) is None
+    shared = {"availability": True, "max_shared": 3}
+    assert slice_mapping.capacity(function("a", shared=shared)) == 3
+
+
+def test_pick_functions_selects_the_least_loaded():
+    shared = {"availability": True}
+    candidates = [
+        function("a", tenants=["s1", "s2"], shared=shared),
+        function("b", tenants=["s3"], shared=shared),
+        function("c", tenants=["s4"], shared=shared),
+        function("d", location="Edge", func=1),
+    ]
+    functions = slice_mapping.pick_functions(candidates)
+    # b and c have the same load - The function with the lower id is selected
+    assert functions[("Core", 0)]["id"] == "b"
+    assert functions[("Edge", 1)]["id"] == "d"
+
+
+def test_pick_functions_skips_the_full_functions():
+    candidates = [
+        function("a", tenants=["s1"]),
+        function("b", tenants=["s1", "s2"], shared={"availability": True, "max_shared": 2}),
+        function("c", location="Edge", tenants=["s1"], shared={"availability": True}),
+    ]
+    functions = slice_mapping.pick_functions(candidates)
+    assert ("Core", 0) not in functions
+    assert functions[("Edge", 0)]["id"] == "c"
+
+
+def test_claim_functions_limits_the_tenants(mongo):
+    selected = [
+        function("a"),
+        function("b", shared={"availability": True, "max_shared": 3}),
+        function("c", shared={"availability": True}),
+    ]
+    mongo.bulk_update.return_value = SimpleNamespace(matched_count=3)
+    assert slice_mapping.claim_functions("s1", selected)
+    updates = mongo.bulk_update.call_args[0][1]
+    assert [data for data, update in updates] == [
+        {"_id": "_a", "tenants.0": {"$exists": False}},
+        {"_id": "_b", "tenants.2": {"$exists": False}},
+        {"_id": "_c"},
+    ]
+    assert all(update == {"$addToSet": {"tenants": "s1"}} for data, update in updates)
+    assert all(func["tenants"] == ["s1"] for func in selected)
+
+
+def test_claim_functions_reverts_when_a_function_is_full(mongo):
+    selected = [function("a"), function("b")]
+    mongo.bulk_update.return_value = SimpleNamespace(matched_count=1)
+    assert not slice_mapping.claim_functions("s1", selected)
+    mongo.bulk_update.assert_called_with(
+        "func", [({"_id": {"$in": ["_a", "_b"]}}, {"$pull": {"tenants": "s1"}})]
+    )
+    assert all(func["tenants"] == [] for func in selected)
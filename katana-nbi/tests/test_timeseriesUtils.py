@@ -0,0 +1,68 @@
+from katana.utils.timeseriesUtils import timeseriesUtils
+
+
+def test_bucket_start():
+    assert timeseriesUtils.bucket_start(3725.5, "1m") == 3720
+    assert timeseriesUtils.bucket_start(3725.5, "1h") == 3600
+    assert timeseriesUtils.bucket_start(3725.5, "raw") == 3600
+
+
+def test_add_sample_updates_every_resolution(mongo):
+    timeseriesUtils.add_sample("vim", {"vcpus_used": 4, "status": "enabled"}, 3725)
+    updates = {data["_id"]: update for data, update in mongo.bulk_upsert.call_args[0][1]}
+    assert sorted(updates) == ["vim:1h:3600", "vim:1m:3720", "vim:raw:3600"]
+    assert updates["vim:raw:3600"]["$push"] == {"samples": {"vcpus_used": 4, "t": 3725}}
+    assert updates["vim:1m:3720"]["$inc"] == {"count": 1, "sum.vcpus_used": 4}
+    assert updates["vim:1m:3720"]["$min"] == {"min.vcpus_used": 4}
+    assert updates["vim:1m:3720"]["$max"] == {"max.vcpus_used": 4}
+
+
+def test_add_sample_without_metrics(mongo):
+    assert timeseriesUtils.add_sample("vim", {"status": "enabled"}, 3725) is None
+    mongo.bulk_upsert.assert_not_called()
+
+
+def test_history_merges_the_buckets_of_a_window(mongo):
+    mongo.find_all.return_value = [
+        {"start": 0, "count": 2, "sum": {"vcpus": 4}, "min": {"vcpus": 1}, "max": {"vcpus": 3}},
+        {"start": 60, "count": 2, "sum": {"vcpus": 8}, "min": {"vcpus": 2}, "max": {"vcpus": 6}},
+        {"start": 120, "count": 1, "sum": {"vcpus": 5}, "min": {"vcpus": 5}, "max": {"vcpus": 5}},
+    ]
+    result = timeseriesUtils.history("vim", "1m", 0, 180, window=120)
+    assert result == [
+        {
+            "start": 0,
+            "end": 120,
+            "count": 4,
+            "avg": {"vcpus": 3},
+            "min": {"vcpus": 1},
+            "max": {"vcpus": 6},
+        },
+        {
+            "start": 120,
+            "end": 240,
+            "count": 1,
+            "avg": {"vcpus": 5},
+            "min": {"vcpus": 5},
+            "max": {"vcpus": 5},
+        },
+    ]
+
+
+def test_history_window_is_a_multiple_of_the_bucket(mongo):
+    mongo.find_all.return_value = [
+        {"start": 60, "count": 1, "sum": {"vcpus": 2}, "min": {"vcpus": 2}, "max": {"vcpus": 2}},
+    ]
+    (window,) = timeseriesUtils.history("vim", "1m", 0, 180, window=90)
+    assert (window["start"], window["end"]) == (60, 120)
+
+
+def test_history_raw_samples_outside_the_range(mongo):
+    mongo.find_all.return_value = [
+        {
+            "start": 0,
+            "samples": [{"t": 10, "vcpus": 1}, {"t": 20, "vcpus": 3}, {"t": 40, "vcpus": 9}],
+        }
+    ]
+    result = timeseriesUtils.history("vim", "raw", 15, 30, window=10)
+    assert [(window["start"], window["avg"]) for window in result] == [(20, {"vcpus": 3})]